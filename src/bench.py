@@ -0,0 +1,660 @@
+'''Micro-benchmarks for the rendering pipeline.
+
+Run from the repository root, e.g.:
+
+    $ python src/bench.py ndc
+'''
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, Optional
+
+import cairo
+import numpy as np
+
+from cgcodecs import BinaryCodec, load_scene, save_scene
+from clipping import LineClippingMethod
+from graphics import Curve, Line, Polygon, Rect, Vec2, Window
+from linalg import array_to_points, Point2, points_to_array
+from render import draw_clipped, RetainedFrame, TileCache
+from scene import Scene
+from transformations import (
+    _ndc_matrix,
+    ndc_matrix,
+    offset_matrix,
+    rotation_matrix,
+    rotation_matrices,
+    scale_matrix,
+    viewport_matrix,
+)
+
+
+BENCHMARKS: Dict[str, Callable[[], None]] = {}
+
+VERTEX_COUNTS = (1_000, 10_000, 100_000, 1_000_000)
+
+
+def benchmark(fn: Callable[[], None]) -> Callable[[], None]:
+    BENCHMARKS[fn.__name__] = fn
+    return fn
+
+
+def best_of(fn: Callable[[], object], repeat: int = 5) -> float:
+    '''Returns the best wall time of `repeat` runs, in milliseconds.'''
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def random_scene(
+    n_vertices: int,
+    per_object: int = 100,
+    size: Optional[float] = None,
+) -> Scene:
+    '''Builds a scene of random polygons with `n_vertices` in total, each
+    within a square of side `size` if given.'''
+    rng = np.random.RandomState(0)
+    coords = rng.uniform(-1000, 1000, size=(n_vertices, 2))
+    if size is not None:
+        centers = coords[::per_object]
+        coords = np.repeat(centers, per_object, axis=0)[:n_vertices]
+        coords += rng.uniform(-size / 2, size / 2, size=(n_vertices, 2))
+    vertices = np.column_stack((coords, np.ones(n_vertices)))
+
+    scene = Scene(window=Window(Vec2(-500, -500), Vec2(500, 500)))
+    for i in range(0, n_vertices, per_object):
+        scene.add_object(Polygon(vertices[i:i + per_object]))
+    return scene
+
+
+def report(title: str, header: str, rows):
+    print(title)
+    print(header)
+    for row in rows:
+        print(row)
+    print()
+
+
+@benchmark
+def ndc():
+    '''Frame time of a window pan against vertex count.'''
+    rows = []
+    for n in VERTEX_COUNTS:
+        scene = random_scene(n)
+        window = scene.window
+        vertices = scene.store.world[:scene.store.used]
+
+        def per_vertex():
+            t_matrix = ndc_matrix(window)
+            return [v @ t_matrix for v in vertices]
+
+        def per_object():
+            for obj in scene.objs:
+                obj.update_ndc(window)
+
+        def batched():
+            scene.window_changed()
+            scene.update_ndc()
+
+        legacy = (
+            f'{best_of(per_vertex, repeat=1):12.2f}'
+            if n <= 100_000 else f'{"-":>12}'
+        )
+        rows.append(
+            f'{n:>10} {legacy} {best_of(per_object):12.2f}'
+            f' {best_of(batched):12.2f}'
+        )
+
+    report(
+        'update_ndc frame time (ms)',
+        f'{"vertices":>10} {"per vertex":>12} {"per object":>12}'
+        f' {"batched":>12}',
+        rows,
+    )
+
+
+@benchmark
+def clip_alloc():
+    '''Memory allocated by one clipping pass over a large scene.'''
+    lines = Scene(window=Window(Vec2(-500, -500), Vec2(500, 500)))
+    rng = np.random.RandomState(1)
+    for start, end in rng.uniform(-1000, 1000, size=(50_000, 2, 2)):
+        lines.add_object(Line(Vec2(*start), Vec2(*end)))
+
+    scenes = {
+        'polygons': random_scene(200_000, per_object=10),
+        'lines': lines,
+    }
+
+    rows = []
+    for name, scene in scenes.items():
+        scene.update_ndc()
+
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        clipped = scene.clip_objects(LineClippingMethod.LIANG_BARSKY)
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        retained = after.compare_to(before, 'filename')
+        rows.append(
+            f'{name:>10} {len(scene.objs):>10} {len(clipped):>10}'
+            f' {sum(s.count_diff for s in retained):>10}'
+            f' {sum(s.size_diff for s in retained) / 1e6:>10.2f}'
+            f' {peak / 1e6:>10.2f}'
+        )
+
+    report(
+        'clip_objects allocations',
+        f'{"scene":>10} {"objects":>10} {"visible":>10} {"blocks":>10}'
+        f' {"kept MB":>10} {"peak MB":>10}',
+        rows,
+    )
+
+
+@benchmark
+def cull():
+    '''Frame time with a window showing a fixed patch of a growing world.'''
+    rows = []
+    for n in VERTEX_COUNTS:
+        scene = Scene(window=Window(Vec2(-100, -100), Vec2(100, 100)))
+        rng = np.random.RandomState(0)
+        # Small polygons spread so the world grows with the vertex count.
+        extent = 10 * np.sqrt(n)
+        for x, y in rng.uniform(-extent, extent, size=(n // 10, 2)):
+            angles = np.linspace(0, 2 * np.pi, 10, endpoint=False)
+            scene.add_object(Polygon([
+                Vec2(x + 5 * np.cos(a), y + 5 * np.sin(a)) for a in angles
+            ]))
+
+        def frame():
+            scene.window_changed()
+            return scene.clip_objects()
+
+        rows.append(
+            f'{n:>10} {len(scene.visible_objects()):>10}'
+            f' {best_of(frame):12.2f}'
+        )
+
+    report(
+        'update_ndc + clip_objects frame time (ms)',
+        f'{"vertices":>10} {"visible":>10} {"frame":>12}',
+        rows,
+    )
+
+
+@benchmark
+def edit():
+    '''Redraw cost after editing one object of a scene fully in view.'''
+    scene = random_scene(500_000, per_object=10)
+    scene.window = Window(Vec2(-1000, -1000), Vec2(1000, 1000))
+
+    def redraw():
+        scene.window_changed()
+        return scene.clip_objects()
+
+    def edit_one():
+        scene.objs[0].translate(Vec2(1, 0))
+        return scene.clip_objects()
+
+    report(
+        'clip_objects time (ms)',
+        f'{"objects":>10} {"full":>12} {"one edited":>12}',
+        [
+            f'{len(scene.objs):>10} {best_of(redraw):12.2f}'
+            f' {best_of(edit_one):12.2f}'
+        ],
+    )
+
+
+@benchmark
+def transform():
+    '''Cost of repeated edits to one object, deferred or baked each time.'''
+    rows = []
+    for n in VERTEX_COUNTS:
+        obj = Polygon(np.column_stack((np.ones((n, 2)), np.ones(n))))
+
+        def deferred():
+            for _ in range(100):
+                obj.translate(Vec2(1, 0))
+
+        def baked():
+            for _ in range(100):
+                obj.translate(Vec2(1, 0))
+                obj.bake()
+
+        rows.append(
+            f'{n:>10} {best_of(deferred):12.2f} {best_of(baked):12.2f}'
+        )
+
+    report(
+        '100 translations (ms)',
+        f'{"vertices":>10} {"deferred":>12} {"baked":>12}',
+        rows,
+    )
+
+
+@benchmark
+def matrices():
+    '''Matrix builder cost, composed vs closed form vs cached, and one
+    batched call vs a loop.'''
+    window = Window(Vec2(-500, -300), Vec2(700, 900), angle=30)
+
+    def composed():
+        (xmin, ymin, _), (xmax, ymax, _) = window.vertices.tolist()
+        return (
+            offset_matrix((xmin + xmax) / -2, (ymin + ymax) / -2)
+            @ rotation_matrix(-window.angle)
+            @ scale_matrix(2 / (xmax - xmin), 2 / (ymax - ymin))
+        )
+
+    def closed_form():
+        (xmin, ymin, _), (xmax, ymax, _) = window.vertices.tolist()
+        return _ndc_matrix.__wrapped__(xmin, ymin, xmax, ymax, window.angle)
+
+    def repeat(fn, n=10_000):
+        return lambda: [fn() for _ in range(n)]
+
+    rows = [
+        f'{"ndc composed":>16} {best_of(repeat(composed)):12.2f}',
+        f'{"ndc closed form":>16} {best_of(repeat(closed_form)):12.2f}',
+        f'{"ndc cached":>16}'
+        f' {best_of(repeat(lambda: ndc_matrix(window))):12.2f}',
+    ]
+
+    angles = np.random.RandomState(0).uniform(-180, 180, 10_000)
+    rows += [
+        f'{"rotation loop":>16}'
+        f' {best_of(lambda: [rotation_matrix(a) for a in angles]):12.2f}',
+        f'{"rotation batch":>16}'
+        f' {best_of(lambda: rotation_matrices(angles)):12.2f}',
+    ]
+
+    report(
+        '10k matrices (ms)',
+        f'{"builder":>16} {"time":>12}',
+        rows,
+    )
+
+
+@benchmark
+def points():
+    '''Point2 against the ndarray-backed Vec2 on scalar operations.'''
+    n = 100_000
+    coords = np.random.RandomState(0).uniform(-1, 1, size=(n, 2)).tolist()
+    vecs = [Vec2(x, y) for x, y in coords]
+    pts = [Point2(x, y) for x, y in coords]
+    array = np.column_stack((np.array(coords), np.ones(n)))
+
+    cases = {
+        'construct': (
+            lambda: [Vec2(x, y) for x, y in coords],
+            lambda: [Point2(x, y) for x, y in coords],
+        ),
+        'read x, y': (
+            lambda: [v.x + v.y for v in vecs],
+            lambda: [p.x + p.y for p in pts],
+        ),
+        'add': (
+            lambda: [v + v for v in vecs],
+            lambda: [p + p for p in pts],
+        ),
+        'to array': (
+            lambda: np.array(vecs),
+            lambda: points_to_array(pts),
+        ),
+        'from array': (
+            lambda: [v.view(Vec2) for v in array],
+            lambda: array_to_points(array),
+        ),
+    }
+
+    report(
+        f'{n // 1000}k point operations (ms)',
+        f'{"operation":>12} {"Vec2":>12} {"Point2":>12}',
+        [
+            f'{name:>12} {best_of(vec, repeat=3):12.2f}'
+            f' {best_of(point, repeat=3):12.2f}'
+            for name, (vec, point) in cases.items()
+        ],
+    )
+
+
+@benchmark
+def curves():
+    '''Bezier tessellation time against segment count.'''
+    rows = []
+    for n_segments in (10, 100, 1_000, 10_000):
+        rng = np.random.RandomState(0)
+        control_points = [
+            Vec2(x, y)
+            for x, y in rng.uniform(-1000, 1000, size=(3 * n_segments + 1, 2))
+        ]
+
+        def per_sample():
+            proj_x = np.array([v.x for v in control_points])
+            proj_y = np.array([v.y for v in control_points])
+            vertices = []
+            for i in range(0, len(control_points) - 1, 3):
+                for t in np.linspace(0, 1, 20):
+                    T = np.array([t**3, t**2, t, 1], dtype=float)
+                    M = T @ Curve.bezier_matrix()
+                    vertices.append(
+                        Vec2(M @ proj_x[i:i + 4], M @ proj_y[i:i + 4])
+                    )
+            return vertices
+
+        def batched():
+            return Curve.from_control_points(control_points)
+
+        legacy = (
+            f'{best_of(per_sample, repeat=1):12.2f}'
+            if n_segments <= 1_000 else f'{"-":>12}'
+        )
+        rows.append(f'{n_segments:>10} {legacy} {best_of(batched):12.2f}')
+
+    report(
+        'Curve.from_control_points, 20 points per segment (ms)',
+        f'{"segments":>10} {"per sample":>12} {"batched":>12}',
+        rows,
+    )
+
+
+@benchmark
+def bspline():
+    '''B-spline tessellation throughput against control point count.'''
+    rows = []
+    for n in (100, 1_000, 10_000, 100_000):
+        control_points = [
+            Vec2(x, y)
+            for x, y in np.random.RandomState(0).uniform(-1000, 1000, (n, 2))
+        ]
+        ms = best_of(
+            lambda: Curve.from_control_points(control_points, type='b-spline')
+        )
+        rows.append(f'{n:>10} {ms:12.2f} {n / ms * 1000:14.0f}')
+
+    report(
+        'B-spline tessellation, 20 steps per segment',
+        f'{"points":>10} {"ms":>12} {"points/s":>14}',
+        rows,
+    )
+
+
+@benchmark
+def lod():
+    '''Adaptive curve tessellation against zoom, on an 800 px viewport.'''
+    rng = np.random.RandomState(0)
+    control_points = [
+        Vec2(x, y) for x, y in rng.uniform(-1000, 1000, size=(301, 2))
+    ]
+    curve = Curve.from_control_points(control_points)
+    fixed = curve._length
+    scene = Scene(
+        objs=[curve],
+        window=Window(Vec2(-16000, -16000), Vec2(16000, 16000))
+    )
+
+    rows = []
+    for zoom in range(-4, 8, 2):
+        scene.tessellate_curves([curve], 800)
+
+        def cold():
+            curve._lods.clear()
+            curve._lod = None
+            scene.tessellate_curves([curve], 800)
+
+        def cached():
+            curve._lod = None
+            scene.tessellate_curves([curve], 800)
+
+        rows.append(
+            f'{2.0 ** zoom:>8g}x {fixed:>10} {curve._length:>10}'
+            f' {best_of(cold):10.2f} {best_of(cached):10.2f}'
+        )
+        scene.zoom_window(0.25)
+
+    report(
+        '100-segment Bezier: vertices and tessellation time (ms)',
+        f'{"zoom":>9} {"fixed":>10} {"adaptive":>10} {"cold":>10}'
+        f' {"cached":>10}',
+        rows,
+    )
+
+
+@benchmark
+def save():
+    '''OBJ save time and peak traced memory against vertex count.'''
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'scene.obj')
+        for n in VERTEX_COUNTS:
+            scene = random_scene(n, per_object=10)
+            ms = best_of(lambda: save_scene(scene, path), repeat=3)
+
+            tracemalloc.start()
+            save_scene(scene, path)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            rows.append(
+                f'{n:>10} {ms:12.2f} {peak / 1e6:12.2f}'
+                f' {os.path.getsize(path) / 1e6:12.2f}'
+            )
+
+    report(
+        'save_scene, 10-vertex polygons',
+        f'{"vertices":>10} {"ms":>12} {"peak MB":>12} {"file MB":>12}',
+        rows,
+    )
+
+
+@benchmark
+def load():
+    '''OBJ load time and peak traced memory for a generated ~100 MB file.'''
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'scene.obj')
+        for n in (200_000, 2_000_000):
+            save_scene(random_scene(n, per_object=10), path)
+            gc.collect()
+            ms = best_of(lambda: load_scene(path), repeat=1)
+
+            tracemalloc.start()
+            scene = load_scene(path)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            store = scene.store
+            store_mb = (store.world.nbytes + store.ndc.nbytes) / 1e6
+            del scene
+
+            rows.append(
+                f'{os.path.getsize(path) / 1e6:>10.1f} {n:>10} {ms:12.2f}'
+                f' {peak / 1e6:12.2f} {store_mb:12.2f}'
+            )
+
+    report(
+        'load_scene, 10-vertex polygons',
+        f'{"file MB":>10} {"vertices":>10} {"ms":>12} {"peak MB":>12}'
+        f' {"store MB":>12}',
+        rows,
+    )
+
+
+@benchmark
+def binary():
+    '''Opening a scene from OBJ and from the memory-mapped binary format.'''
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in (200_000, 2_000_000):
+            scene = random_scene(n, per_object=100)
+            for ext in ('.obj', BinaryCodec.EXTENSION):
+                path = os.path.join(tmp, 'scene' + ext)
+                save_scene(scene, path)
+                gc.collect()
+                ms = best_of(lambda: load_scene(path), repeat=3)
+
+                tracemalloc.start()
+                loaded = load_scene(path)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                del loaded
+
+                rows.append(
+                    f'{ext:>10} {os.path.getsize(path) / 1e6:>10.1f}'
+                    f' {n:>10} {ms:12.2f} {peak / 1e6:12.2f}'
+                )
+
+    report(
+        'load_scene, 100-vertex polygons',
+        f'{"format":>10} {"file MB":>10} {"vertices":>10} {"ms":>12}'
+        f' {"peak MB":>12}',
+        rows,
+    )
+
+
+@benchmark
+def draw():
+    '''Frame drawing: one cairo path per object against one per style.'''
+    rows = []
+    viewport = Rect(Vec2(0, 0), Vec2(800, 600))
+    vp_matrix = viewport_matrix(viewport)
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 800, 600)
+
+    for n in (1_000, 10_000, 100_000):
+        scene = random_scene(10 * n, per_object=10)
+        scene.window = Window(Vec2(-1000, -1000), Vec2(1000, 1000))
+        for i, obj in enumerate(scene.objs):
+            obj.filled = i % 2 == 0
+        clipped = scene.clip_objects()
+
+        def per_object():
+            cr = cairo.Context(surface)
+            for geometry in clipped:
+                geometry.draw(cr, vp_matrix)
+
+        def batched():
+            draw_clipped(cairo.Context(surface), clipped, vp_matrix)
+
+        rows.append(
+            f'{n:>10} {best_of(per_object, repeat=3):12.2f}'
+            f' {best_of(batched, repeat=3):12.2f}'
+        )
+
+    report(
+        'draw time, 10-vertex polygons, half filled (ms)',
+        f'{"objects":>10} {"per object":>12} {"batched":>12}',
+        rows,
+    )
+
+
+@benchmark
+def pan():
+    '''Frame time of a 4-pixel pan over small polygons: whole frame
+    against retained frame.'''
+    rows = []
+    viewport = Rect(Vec2(0, 0), Vec2(800, 600))
+    method = LineClippingMethod.COHEN_SUTHERLAND
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 800, 600)
+
+    for n in (10_000, 100_000, 1_000_000):
+        scene = random_scene(n, per_object=10, size=20)
+        scene.window = Window(Vec2(-800, -600), Vec2(800, 600))
+        step = Vec2(4 * scene.window.width / 800, 0)
+        frame = RetainedFrame()
+        frame.paint(cairo.Context(surface), scene, viewport, method)
+
+        def full():
+            scene.translate_window(step)
+            draw_clipped(
+                cairo.Context(surface),
+                scene.clip_objects(method, viewport_width=800),
+                viewport_matrix(viewport),
+            )
+
+        def retained():
+            scene.translate_window(step)
+            frame.paint(cairo.Context(surface), scene, viewport, method)
+
+        rows.append(
+            f'{n:>10} {best_of(full):12.2f} {best_of(retained):12.2f}'
+        )
+
+    report(
+        'pan frame time (ms)',
+        f'{"vertices":>10} {"full":>12} {"retained":>12}',
+        rows,
+    )
+
+
+@benchmark
+def zoom():
+    '''Frame time when zooming back and forth: whole frames against
+    cached tiles.'''
+    rows = []
+    viewport = Rect(Vec2(0, 0), Vec2(800, 600))
+    method = LineClippingMethod.COHEN_SUTHERLAND
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 800, 600)
+
+    for n in (10_000, 100_000, 1_000_000):
+        scene = random_scene(n, per_object=10, size=20)
+        scene.window = Window(Vec2(-800, -600), Vec2(800, 600))
+        factors = iter([0.5, 2.0] * 1000)
+
+        def full():
+            scene.zoom_window(next(factors))
+            draw_clipped(
+                cairo.Context(surface),
+                scene.clip_objects(method, viewport_width=800),
+                viewport_matrix(viewport),
+            )
+
+        frame = RetainedFrame(tiles=TileCache())
+
+        def tiled():
+            scene.zoom_window(next(factors))
+            frame.paint(cairo.Context(surface), scene, viewport, method)
+
+        # Both zoom levels rendered once.
+        tiled()
+        tiled()
+        rows.append(
+            f'{n:>10} {best_of(full, repeat=6):12.2f}'
+            f' {best_of(tiled, repeat=6):12.2f}'
+        )
+
+    report(
+        'zoom frame time, levels seen before (ms)',
+        f'{"vertices":>10} {"full":>12} {"tiles":>12}',
+        rows,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        'names',
+        nargs='*',
+        help=f'benchmarks to run: {", ".join(sorted(BENCHMARKS))}'
+             ' (default: all)',
+    )
+    args = parser.parse_args()
+
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error(f'unknown benchmark: {name}')
+
+    for name in args.names or sorted(BENCHMARKS):
+        BENCHMARKS[name]()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,139 +1,846 @@
 from __future__ import annotations  # for postponed annotations
+import argparse
+import io
+import os
+import tempfile
 from pathlib import Path
-from typing import List
+from typing import (
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+)
 
+import numpy as np
 
-from graphics import Vec2, GraphicObject, Point, Line, Polygon, Curve, Window
+from graphics import GraphicObject, Point, Line, Polygon, Curve, Window
 from scene import Scene
+from vertexstore import VertexStore
+
+
+# Curve types as named by `Curve` and by the OBJ cstype statement.
+CURVE_TYPES = {'bezier': 'bezier', 'b-spline': 'bspline'}
+OBJ_CURVE_TYPES = {v: k for k, v in CURVE_TYPES.items()}
 
 
 class ObjCodec:
-    @classmethod
-    def encode_vec2(cls, v: Vec2) -> str:
-        return f'{v.x} {v.y} 1.0'
+    # Vertices formatted and written per chunk of this many rows.
+    CHUNK_ROWS = 1 << 16
 
     @classmethod
     def encode(cls, scene: Scene) -> str:
         '''Writes a subset of the Wavefront OBJ file format in ASCII.'''
-        vertices_txt = ''
-        objects_txt = ''
-        idx = 1
+        buffer = io.StringIO()
+        cls.write(scene, buffer)
+        return buffer.getvalue()
+
+    @classmethod
+    def write(
+        cls,
+        scene: Scene,
+        file: TextIO,
+        progress: Optional[Callable[[float], None]] = None,
+    ):
+        '''Streams the scene into `file` in the format of `encode`,
+        calling `progress` with the fraction of the work done.'''
+        total = 2 * len(scene.objs) or 1
+
+        def report(done: int):
+            if progress is not None:
+                progress(done / total)
+
         if scene.window is not None:
-            vertices_txt += f'v {cls.encode_vec2(scene.window.min)}\n'
-            vertices_txt += f'v {cls.encode_vec2(scene.window.max)}\n'
+            cls._write_vertices(
+                file,
+                np.array([scene.window.min[:2], scene.window.max[:2]])
+            )
+
+        chunk: List[np.ndarray] = []
+        rows = 0
+        for i, obj in enumerate(scene.objs):
+            xy = cls._vertices_of(obj)
+            if xy is None:
+                continue
+            chunk.append(xy)
+            rows += len(xy)
+            if rows >= cls.CHUNK_ROWS:
+                cls._write_vertex_chunk(file, chunk)
+                rows = 0
+                report(i + 1)
+        cls._write_vertex_chunk(file, chunk)
 
-            objects_txt += f'o window\n'
-            objects_txt += f'w {idx} {idx + 1}\n'
+        idx = 1
+        if scene.window is not None:
+            file.write(f'o window\nw {idx} {idx + 1}\n')
             idx += 2
 
-        for obj in scene.objs:
-            objects_txt += f'o {obj.name}\n'
+        for i, obj in enumerate(scene.objs):
+            file.write(f'o {obj.name}\n')
+            n = cls._vertex_count(obj)
+            if n is not None:
+                file.writelines(cls._record(obj, idx, n))
+                idx += n
+            if i % cls.CHUNK_ROWS == 0:
+                report(len(scene.objs) + i + 1)
+        report(total)
+
+    @classmethod
+    def _write_vertex_chunk(cls, file: TextIO, chunk: List[np.ndarray]):
+        '''Writes and empties a list of coordinate arrays.'''
+        if len(chunk) == 1:
+            cls._write_vertices(file, chunk[0])
+        elif chunk:
+            cls._write_vertices(file, np.concatenate(chunk))
+        chunk.clear()
 
-            if isinstance(obj, Point):
-                vertices_txt += f'v {cls.encode_vec2(obj.pos)}\n'
+    @classmethod
+    def _write_vertices(cls, file: TextIO, xy: np.ndarray):
+        '''Writes `v` lines for an `(n, 2)` array of coordinates.'''
+        for start in range(0, len(xy), cls.CHUNK_ROWS):
+            block = xy[start:start + cls.CHUNK_ROWS]
+            # Python floats format with repr, as f-strings do.
+            file.write(
+                ('v %r %r 1.0\n' * len(block)) % tuple(block.ravel().tolist())
+            )
 
-                objects_txt += f'p {idx}\n'
-                idx += 1
+    @classmethod
+    def _vertices_of(cls, obj: GraphicObject) -> Optional[np.ndarray]:
+        '''The `(n, 2)` coordinates written for `obj`, or None for objects
+        the format does not cover.'''
+        if isinstance(obj, Curve) and obj.control_points is not None:
+            obj.bake()
+            return obj.control_points[:, :2]
+        if isinstance(obj, (Point, Line, Polygon, Curve)):
+            return obj.vertices[:, :2]
+        return None
 
-            elif isinstance(obj, Line):
-                vertices_txt += f'v {cls.encode_vec2(obj.start)}\n'
-                vertices_txt += f'v {cls.encode_vec2(obj.end)}\n'
+    @classmethod
+    def _vertex_count(cls, obj: GraphicObject) -> Optional[int]:
+        if isinstance(obj, Curve) and obj.control_points is not None:
+            return len(obj.control_points)
+        if isinstance(obj, (Point, Line, Polygon, Curve)):
+            return obj._length
+        return None
 
-                objects_txt += f'l {idx} {idx + 1}\n'
-                idx += 2
+    @classmethod
+    def _indexes(cls, start: int, n: int) -> Iterator[str]:
+        '''Space-separated indexes `start` to `start + n - 1`, in pieces of
+        at most `CHUNK_ROWS` indexes.'''
+        for first in range(start, start + n, cls.CHUNK_ROWS):
+            last = min(first + cls.CHUNK_ROWS, start + n)
+            yield (' ' if first > start else '') + ' '.join(
+                map(str, range(first, last))
+            )
 
-            elif isinstance(obj, Polygon):
-                n = len(obj.vertices)
-                indexes = ''
-                for i in range(n):
-                    vertices_txt += f'v {cls.encode_vec2(obj.vertices[i])}\n'
-                    indexes += f'{idx + i} '
-                indexes += f'{idx}'
+    @classmethod
+    def _record(cls, obj: GraphicObject, idx: int, n: int) -> Iterator[str]:
+        '''Element statements of an object whose vertices start at `idx`.'''
+        if isinstance(obj, Point):
+            yield f'p {idx}\n'
 
-                if obj.filled:
-                    objects_txt += f'usemtl filled\n'
-                objects_txt += f'l {indexes}\n'
-                idx += n
+        elif isinstance(obj, Polygon):
+            if obj.filled:
+                yield 'usemtl filled\n'
+            yield 'l '
+            yield from cls._indexes(idx, n)
+            yield f' {idx}\n'
 
-            elif isinstance(obj, Curve):
-                n = len(obj.vertices)
-                indexes = ''
-                for i in range(0, n):
-                    vertices_txt += f'v {cls.encode_vec2(obj.vertices[i])}\n'
-                    indexes += f'{idx + i} '
-                indexes = indexes.strip()
+        elif isinstance(obj, Curve) and obj.control_points is not None:
+            assert obj.curve_type is not None
+            if obj.curve_type == 'bezier':
+                u_max = (n - 1) // 3
+                knots = range(u_max + 1)
+                u_min = 0
+            else:
+                # Uniform cubic B-spline: n + 4 knots, and the curve is
+                # defined between the fourth and the n-th.
+                knots = range(n + 4)
+                u_min, u_max = 3, n
 
-                objects_txt += f'l {indexes}\n'
-                idx += n
+            yield f'cstype {CURVE_TYPES[obj.curve_type]}\ndeg 3\n'
+            yield f'curv {u_min}.0 {u_max}.0 '
+            yield from cls._indexes(idx, n)
+            yield f'\nparm u {" ".join(f"{k}.0" for k in knots)}\nend\n'
 
-        return vertices_txt + objects_txt
+        else:
+            # Lines and polylines.
+            yield 'l '
+            yield from cls._indexes(idx, n)
+            yield '\n'
 
     @classmethod
     def decode(cls, obj_file: str) -> 'Scene':
-        from scene import Scene
-        # Returns a Scene with the window and objects found
-        vertices = []
-        objs: List[GraphicObject] = []
-        window = None
+        '''Returns a Scene with the window and objects found.'''
+        return cls.read(io.StringIO(obj_file))
 
-        current_name = ''
-        filled = False
+    @classmethod
+    def read(
+        cls,
+        file: TextIO,
+        progress: Optional[Callable[[float], None]] = None,
+        size: Optional[int] = None,
+    ) -> Scene:
+        '''Reads a scene from `file`, calling `progress` with the fraction
+        of its `size` characters read.'''
+        reader = ObjReader()
+        for _ in cls._parse(file, reader, progress, size):
+            pass
 
-        for line in obj_file.splitlines():
-            cmd, *args = line.split(' ')
+        scene = reader.scene()
+        if progress is not None:
+            progress(1.0)
+        return scene
 
-            if cmd == 'v':
-                vertices.append(Vec2(float(args[0]), float(args[1])))
-            elif cmd == 'o':
-                current_name = ' '.join(args)
-            elif cmd == 'usemtl':
-                if args[0] == 'filled':
-                    filled = True
-            elif cmd == 'p':
-                objs.append(
-                    Point(pos=vertices[int(args[0]) - 1], name=current_name)
+    @classmethod
+    def read_batches(
+        cls,
+        file: TextIO,
+        batch_size: int,
+        progress: Optional[Callable[[float], None]] = None,
+        size: Optional[int] = None,
+    ) -> Iterator[Tuple[Optional[Window], List[GraphicObject]]]:
+        '''Reads `file` like `read`, yielding the window found so far and
+        the standalone objects parsed since the previous batch.'''
+        reader = ObjReader(bind=False)
+        for _ in cls._parse(file, reader, progress, size, batch_size):
+            yield reader.window, reader.take()
+
+        yield reader.window, reader.take()
+        if progress is not None:
+            progress(1.0)
+
+    @classmethod
+    def _parse(
+        cls,
+        file: TextIO,
+        reader: 'ObjReader',
+        progress: Optional[Callable[[float], None]],
+        size: Optional[int],
+        batch_size: int = 0,
+    ) -> Iterator[None]:
+        '''Feeds the lines of `file` to `reader`, yielding whenever it holds
+        `batch_size` objects, if given.'''
+        pending = reader.pending
+        report_every = cls.CHUNK_ROWS
+
+        for line in file:
+            if line.startswith('v '):
+                pending.append(line)
+                if len(pending) >= cls.CHUNK_ROWS:
+                    reader.flush_vertices()
+            else:
+                reader.add_line(line)
+                if batch_size and len(reader.objs) >= batch_size:
+                    yield
+
+            if progress is not None and size:
+                report_every -= 1
+                if not report_every:
+                    report_every = cls.CHUNK_ROWS
+                    progress(min(reader.chars / size, 1.0))
+
+        reader.flush_vertices()
+
+
+class ObjReader:
+    '''Parsing state of `ObjCodec.read`, which reads the vertices into the
+    scene's store.'''
+
+    def __init__(self, bind: bool = True):
+        self.bind = bind
+        self.store = VertexStore()
+        # `v` lines not parsed yet.
+        self.pending: List[str] = []
+        # Rows before this one are bound to an object or left as holes.
+        self.claimed_end = 0
+        self.claimed_rows = 0
+        # Characters consumed, for progress reports.
+        self.chars = 0
+
+        self.objs: List[GraphicObject] = []
+        self.bound: List[Tuple[GraphicObject, int]] = []
+        self.window: Optional[Window] = None
+        self.name = ''
+        self.filled = False
+        self.curve_type: Optional[str] = None
+        self.degree = 3
+        # Parameter range and control point count of the last curve.
+        self.curve_range: Optional[Tuple[float, float, int]] = None
+
+    def flush_vertices(self):
+        '''Parses the pending `v` lines with one vectorized conversion.'''
+        if not self.pending:
+            return
+
+        n = len(self.pending)
+        text = ''.join(self.pending)
+        self.chars += len(text)
+        if '#' in text:
+            text = ''.join(
+                self.uncommented(line) + '\n' for line in self.pending
+            )
+        if not text.endswith('\n'):
+            text += '\n'
+        # No number contains a 'v', so dropping them leaves only values.
+        # A NaN ends each line, so stopping early at a bad token, as NumPy
+        # before 2.0 does, loses the last one.
+        try:
+            values = np.fromstring(
+                text.replace('v', '').replace('\n', ' nan '), sep=' '
+            )
+        except ValueError:
+            line = next(
+                (
+                    line for line in self.pending
+                    if self.numbers(self.uncommented(line)[1:]) is None
+                ),
+                self.pending[0],
+            )
+            raise ValueError(f'malformed vertex: {line!r}') from None
+        ends = np.flatnonzero(np.isnan(values))
+        counts = np.diff(ends, prepend=-1) - 1
+        bad = np.flatnonzero((counts < 2) | (counts > 4))
+        if len(ends) != n or len(bad):
+            line = bad[0] if len(bad) else min(len(ends), n - 1)
+            raise ValueError(f'malformed vertex: {self.pending[line]!r}')
+
+        rows = np.ones((n, 3))
+        starts = ends - counts
+        rows[:, 0] = values[starts]
+        rows[:, 1] = values[starts + 1]
+
+        offset = self.store.allocate(n)
+        self.store.world[offset:offset + n] = rows
+        self.pending.clear()
+
+    def indexes(self, args: str) -> np.ndarray:
+        '''Zero-based rows of a list of OBJ vertex references, which count
+        from 1, or from the end when negative.'''
+        refs = self.numbers(args, dtype=np.int64)
+        if refs is None or not len(refs):
+            raise ValueError(f'malformed vertex indexes: {args!r}')
+        return np.where(refs < 0, self.store.used + refs, refs - 1)
+
+    @staticmethod
+    def uncommented(line: str) -> str:
+        '''`line` without a trailing `# comment` or line break.'''
+        return line.partition('#')[0].rstrip()
+
+    @staticmethod
+    def numbers(text: str, dtype=float) -> Optional[np.ndarray]:
+        '''The whitespace-separated numbers in `text`, or None if any token
+        is not one.'''
+        # NumPy before 2.0 stops at the first bad token with only a
+        # warning; a trailing sentinel makes that show in the count.
+        try:
+            values = np.fromstring(text + ' 0', dtype=dtype, sep=' ')
+        except ValueError:
+            return None
+        if len(values) != len(text.split()) + 1:
+            return None
+        return values[:-1]
+
+    @staticmethod
+    def is_run(indexes: np.ndarray) -> bool:
+        '''Whether `indexes` are consecutive and increasing.'''
+        first, last = int(indexes[0]), int(indexes[-1])
+        return last - first == len(indexes) - 1 and (
+            len(indexes) < 3
+            or indexes.tolist() == list(range(first, last + 1))
+        )
+
+    def rows(self, indexes: np.ndarray) -> np.ndarray:
+        run = self.is_run(indexes)
+        if run:
+            first, last = int(indexes[0]), int(indexes[-1])
+        else:
+            first, last = int(indexes.min()), int(indexes.max())
+        # Rows past `used` exist, but were never read.
+        if first < 0 or last >= self.store.used:
+            raise ValueError(
+                f'vertex index out of range, {self.store.used} vertices read'
+            )
+
+        if run:
+            return self.store.world[first:last + 1]
+        return self.store.world[indexes]
+
+    def add_object(self, obj: GraphicObject, indexes: np.ndarray):
+        '''Adds an object built from the rows at `indexes`, binding it to
+        them when they are an unclaimed run.'''
+        if (
+            self.bind
+            and indexes[0] >= self.claimed_end
+            and self.is_run(indexes)
+        ):
+            self.bound.append((obj, int(indexes[0])))
+            self.claimed_end = int(indexes[-1]) + 1
+            self.claimed_rows += len(indexes)
+        self.objs.append(obj)
+
+    def take(self) -> List[GraphicObject]:
+        '''Returns the objects read since the last call.'''
+        objs = self.objs
+        self.objs = []
+        return objs
+
+    def add_line(self, line: str):
+        try:
+            self._add_line(line)
+        except (IndexError, KeyError) as e:
+            raise ValueError(f'malformed line: {line.strip()!r}') from e
+
+    def _add_line(self, line: str):
+        self.flush_vertices()
+        self.chars += len(line)
+
+        cmd, _, args = line.rstrip('\r\n').partition(' ')
+
+        if cmd == 'o':
+            self.name = args
+        elif cmd == 'usemtl':
+            if args.split()[0] == 'filled':
+                self.filled = True
+        elif cmd == 'p':
+            indexes = self.indexes(args)
+            self.add_object(
+                Point(pos=self.rows(indexes)[0], name=self.name),
+                indexes,
+            )
+        elif cmd == 'l':
+            indexes = self.indexes(args)
+            if len(indexes) == 2:
+                start, end = self.rows(indexes)
+                self.add_object(
+                    Line(start=start, end=end, name=self.name),
+                    indexes,
                 )
-            elif cmd == 'l':
-                if len(args) == 2:
-                    objs.append(
-                        Line(
-                            start=vertices[int(args[0]) - 1],
-                            end=vertices[int(args[1]) - 1],
-                            name=current_name
-                        )
-                    )
-                elif args[0] == args[-1]:
-                    objs.append(
-                        Polygon(
-                            vertices=[vertices[int(i) - 1] for i in args[:-1]],
-                            name=current_name,
-                            filled=filled
-                        )
+            elif indexes[0] == indexes[-1]:
+                indexes = indexes[:-1]
+                self.add_object(
+                    Polygon(
+                        vertices=self.rows(indexes),
+                        name=self.name,
+                        filled=self.filled
+                    ),
+                    indexes,
+                )
+                self.filled = False
+            else:
+                self.add_object(
+                    Curve(vertices=self.rows(indexes), name=self.name),
+                    indexes,
+                )
+        elif cmd == 'cstype':
+            *qualifiers, name = args.split()
+            if qualifiers:
+                raise ValueError(f'unsupported curve type: {args!r}')
+            self.curve_type = OBJ_CURVE_TYPES.get(name)
+        elif cmd == 'deg':
+            self.degree = int(args.split()[0])
+        elif cmd == 'curv':
+            if self.curve_type is None or self.degree != 3:
+                raise ValueError(
+                    f'unsupported curve: {args!r}, only cubic Bezier and'
+                    ' B-spline curves can be read'
+                )
+            u0, u1, refs = args.split(None, 2)
+            indexes = self.indexes(refs)
+            self.curve_range = (float(u0), float(u1), len(indexes))
+            # Tessellated by the scene when first drawn.
+            self.objs.append(
+                Curve(
+                    vertices=[],
+                    name=self.name,
+                    control_points=np.array(self.rows(indexes)),
+                    curve_type=self.curve_type,
+                )
+            )
+        elif cmd == 'parm':
+            self.check_knots(args)
+        elif cmd == 'w':
+            start, end = self.rows(self.indexes(args))
+            self.window = Window(min=start, max=end)
+
+    def check_knots(self, args: str):
+        '''Rejects knot vectors of the last curve that `Curve` cannot
+        represent.'''
+        direction, _, values = args.partition(' ')
+        knots = self.numbers(values)
+        if (
+            direction != 'u'
+            or self.curve_range is None
+            or knots is None
+            or not len(knots)
+        ):
+            raise ValueError(f'unsupported parm statement: {args!r}')
+
+        u0, u1, n = self.curve_range
+        steps = np.diff(knots)
+        if self.curve_type == 'bezier':
+            # Any increasing knots give the same segments.
+            supported = (
+                len(knots) == (n - 1) // 3 + 1
+                and bool(np.all(steps > 0))
+                and np.allclose((u0, u1), knots[[0, -1]])
+            )
+        else:
+            supported = (
+                len(knots) == n + 4
+                and steps[0] > 0
+                and np.allclose(steps, steps[0])
+                and np.allclose((u0, u1), knots[[3, n]])
+            )
+        if not supported:
+            raise ValueError(
+                f'unsupported knot vector: {values!r}, only uniform'
+                ' B-splines and whole curves can be read'
+            )
+        self.curve_range = None
+
+    def scene(self) -> Scene:
+        '''Builds the scene, with the vertex store as its store.'''
+        self.flush_vertices()
+
+        for obj, offset in self.bound:
+            obj.bind(self.store, offset)
+        # Rows no object was bound to, such as the window's.
+        self.store.freed = self.store.used - self.claimed_rows
+
+        return Scene(objs=self.objs, window=self.window, store=self.store)
+
+
+class BinaryCodec:
+    '''Scene files made of NumPy `.npy` records, in the order of `ARRAYS`,
+    whose vertices are memory-mapped as the scene's store.'''
+
+    MAGIC = b'CGSCENE\x01'
+    EXTENSION = '.cgscene'
+
+    # Object kinds, as stored in `kinds`; curves with control points go by
+    # their curve type.
+    KINDS = ('point', 'line', 'polygon', 'curve', 'bezier', 'b-spline')
+    # Bits of `flags`.
+    FILLED = 1
+
+    # Object i spans entries i to i + 1 of `offsets` and `name_offsets`.
+    ARRAYS = (
+        'window',
+        'kinds',
+        'flags',
+        'offsets',
+        'bounds',
+        'name_offsets',
+        'names',
+        'vertices',
+    )
+
+    @classmethod
+    def write(
+        cls,
+        scene: Scene,
+        file: BinaryIO,
+        progress: Optional[Callable[[float], None]] = None,
+    ):
+        '''Writes the scene, calling `progress` with the fraction of the
+        objects written.'''
+        objs: List[GraphicObject] = []
+        vertex_counts: List[int] = []
+        for obj in scene.objs:
+            count = ObjCodec._vertex_count(obj)
+            if count is not None:
+                objs.append(obj)
+                vertex_counts.append(count)
+        counts = np.array(vertex_counts, dtype=np.int64)
+
+        kinds = np.empty(len(objs), dtype=np.uint8)
+        flags = np.zeros(len(objs), dtype=np.uint8)
+        bounds = np.empty((len(objs), 2, 2))
+        names = []
+        for i, obj in enumerate(objs):
+            kinds[i] = cls.KINDS.index(cls._kind(obj))
+            if isinstance(obj, Polygon) and obj.filled:
+                flags[i] = cls.FILLED
+            bounds[i] = obj.bounds()
+            names.append(obj.name.encode())
+
+        window = np.empty((0, 3))
+        if scene.window is not None:
+            window = np.ones((2, 3))
+            window[0, :2] = scene.window.min[:2]
+            window[1, :2] = scene.window.max[:2]
+
+        file.write(cls.MAGIC)
+        for array in (
+            window,
+            kinds,
+            flags,
+            np.concatenate(([0], np.cumsum(counts))),
+            bounds,
+            np.cumsum([0] + [len(name) for name in names]),
+            np.frombuffer(b''.join(names), dtype=np.uint8),
+        ):
+            np.lib.format.write_array(file, array, allow_pickle=False)
+
+        np.lib.format.write_array_header_1_0(file, {
+            'descr': np.lib.format.dtype_to_descr(np.dtype(float)),
+            'fortran_order': False,
+            'shape': (int(counts.sum()), 3),
+        })
+        chunk: List[np.ndarray] = []
+        rows = 0
+        for i, obj in enumerate(objs):
+            xy = ObjCodec._vertices_of(obj)
+            if xy is None:
+                raise TypeError(f'cannot write {type(obj).__name__}')
+            chunk.append(xy)
+            rows += len(xy)
+            if rows >= ObjCodec.CHUNK_ROWS or i == len(objs) - 1:
+                block = np.ones((rows, 3))
+                block[:, :2] = np.concatenate(chunk)
+                file.write(block.tobytes())
+                chunk.clear()
+                rows = 0
+                if progress is not None:
+                    progress((i + 1) / len(objs))
+        if progress is not None:
+            progress(1.0)
+
+    @classmethod
+    def _kind(cls, obj: GraphicObject) -> str:
+        if isinstance(obj, Curve) and obj.control_points is not None:
+            assert obj.curve_type is not None
+            return obj.curve_type
+        return type(obj).__name__.lower()
+
+    @classmethod
+    def _read_arrays(cls, path: Path) -> Dict[str, np.ndarray]:
+        '''Reads every record, memory-mapping `vertices` copy-on-write.'''
+        arrays: Dict[str, np.ndarray] = {}
+        with open(path, 'rb') as file:
+            if file.read(len(cls.MAGIC)) != cls.MAGIC:
+                raise ValueError(f'not a scene file: {path}')
+
+            for name in cls.ARRAYS:
+                version = np.lib.format.read_magic(file)
+                if version == (1, 0):
+                    header = np.lib.format.read_array_header_1_0(file)
+                else:
+                    header = np.lib.format.read_array_header_2_0(file)
+                shape, fortran_order, dtype = header
+                count = int(np.prod(shape))
+                offset = file.tell()
+
+                if name == 'vertices' and count:
+                    arrays[name] = np.memmap(
+                        path,
+                        dtype=dtype,
+                        mode='c',
+                        offset=offset,
+                        shape=shape,
                     )
-                    filled = False
                 else:
-                    objs.append(
-                        Curve(
-                            vertices=[vertices[int(i) - 1] for i in args],
-                            name=current_name,
-                        )
+                    arrays[name] = np.fromfile(
+                        file,
+                        dtype=dtype,
+                        count=count,
+                    ).reshape(shape)
+                file.seek(offset + count * dtype.itemsize)
+        return arrays
+
+    @classmethod
+    def read(
+        cls,
+        path: Path,
+        progress: Optional[Callable[[float], None]] = None,
+    ) -> Scene:
+        '''Opens a scene file, calling `progress` with the fraction of the
+        objects built.'''
+        window, objs, store = cls.read_objects(path, progress)
+        scene = Scene(objs=objs, window=window, store=store)
+        if progress is not None:
+            progress(1.0)
+        return scene
+
+    @classmethod
+    def read_objects(
+        cls,
+        path: Path,
+        progress: Optional[Callable[[float], None]] = None,
+    ) -> Tuple[Optional[Window], List[GraphicObject], VertexStore]:
+        '''The window, the objects and the mapped store they view.'''
+        arrays = cls._read_arrays(path)
+        try:
+            return cls._objects(arrays, progress)
+        except (IndexError, KeyError) as e:
+            raise ValueError(f'malformed scene file: {path}') from e
+
+    @classmethod
+    def _objects(
+        cls,
+        arrays: Dict[str, np.ndarray],
+        progress: Optional[Callable[[float], None]],
+    ) -> Tuple[Optional[Window], List[GraphicObject], VertexStore]:
+        world = arrays['vertices']
+
+        store = VertexStore()
+        store.world = world
+        # Zeroed pages are only committed when written, like the mapping.
+        store.ndc = np.zeros((len(world), 3))
+        store.used = len(world)
+
+        names = arrays['names'].tobytes()
+        name_offsets = arrays['name_offsets'].tolist()
+        offsets = arrays['offsets'].tolist()
+        bounds = arrays['bounds']
+        report_every = ObjCodec.CHUNK_ROWS
+
+        kinds = arrays['kinds'].tolist()
+        objs: List[GraphicObject] = []
+        for i, (kind_index, flags) in enumerate(
+            zip(kinds, arrays['flags'].tolist())
+        ):
+            kind = cls.KINDS[kind_index]
+            name = names[name_offsets[i]:name_offsets[i + 1]].decode()
+            start, end = offsets[i], offsets[i + 1]
+
+            if kind in CURVE_TYPES:
+                # Tessellated by the scene, in a store of its own, when
+                # first drawn. The control point rows stay unused, but do
+                # not count as freed: compacting would read the whole
+                # mapping to reclaim them.
+                objs.append(
+                    Curve(
+                        vertices=[],
+                        name=name,
+                        control_points=np.array(world[start:end]),
+                        curve_type=kind,
                     )
-            elif cmd == 'w':
-                window = Window(
-                    min=vertices[int(args[0]) - 1],
-                    max=vertices[int(args[1]) - 1]
                 )
+            else:
+                obj = cls._build(kind, world, start, end, name, flags)
+                obj.attach(store, start, end - start, bounds[i])
+                objs.append(obj)
+
+            report_every -= 1
+            if progress is not None and not report_every:
+                report_every = ObjCodec.CHUNK_ROWS
+                progress(i / len(kinds))
+
+        window = None
+        if len(arrays['window']):
+            start, end = arrays['window']
+            window = Window(min=start, max=end)
+
+        return window, objs, store
+
+    @classmethod
+    def _build(
+        cls,
+        kind: str,
+        world: np.ndarray,
+        start: int,
+        end: int,
+        name: str,
+        flags: int,
+    ) -> GraphicObject:
+        '''An object of `kind`, to be attached to rows `start` to `end`.'''
+        if kind == 'point':
+            return Point(pos=world[start], name=name)
+        if kind == 'line':
+            return Line(start=world[start], end=world[end - 1], name=name)
+        if kind == 'polygon':
+            return Polygon(
+                vertices=[],
+                name=name,
+                filled=bool(flags & cls.FILLED),
+            )
+        return Curve(vertices=[], name=name)
+
+
+def load_scene(
+    path: Path,
+    progress: Optional[Callable[[float], None]] = None,
+) -> Scene:
+    '''Reads a scene file, in the format its extension names.'''
+    if Path(path).suffix == BinaryCodec.EXTENSION:
+        return BinaryCodec.read(path, progress)
+    with open(path, buffering=1 << 20) as file:
+        return ObjCodec.read(file, progress, os.path.getsize(path))
+
+
+def read_scene_batches(
+    path: Path,
+    batch_size: int,
+    progress: Optional[Callable[[float], None]] = None,
+) -> Iterator[
+    Tuple[Optional[Window], List[GraphicObject], Optional[VertexStore]]
+]:
+    '''Reads a scene file like `load_scene`, as batches of at most
+    `batch_size` objects. Each batch comes with the window read so far and
+    the store its objects view, or None for standalone objects.'''
+    if Path(path).suffix == BinaryCodec.EXTENSION:
+        # Objects view the mapped store; a scene built on it adopts them
+        # without copying.
+        window, objs, store = BinaryCodec.read_objects(path, progress)
+        if progress is not None:
+            progress(1.0)
+        for start in range(0, len(objs), batch_size):
+            yield window, objs[start:start + batch_size], store
+        return
+
+    with open(path, buffering=1 << 20) as file:
+        for window, objs in ObjCodec.read_batches(
+            file,
+            batch_size,
+            progress,
+            os.path.getsize(path),
+        ):
+            yield window, objs, None
+
+
+def save_scene(
+    scene: Scene,
+    path: Path,
+    progress: Optional[Callable[[float], None]] = None,
+):
+    '''Writes a scene file, in the format chosen like `load_scene` does.'''
+    scene.bake()
+    if Path(path).suffix != BinaryCodec.EXTENSION:
+        with open(path, 'w', buffering=1 << 20) as file:
+            ObjCodec.write(scene, file, progress)
+        return
+
+    # The scene may still map the file being overwritten.
+    directory, base = os.path.split(os.path.abspath(path))
+    fd, temp = tempfile.mkstemp(prefix=base, dir=directory)
+    try:
+        with os.fdopen(fd, 'wb', buffering=1 << 20) as file:
+            BinaryCodec.write(scene, file, progress)
+        os.replace(temp, path)
+    except BaseException:
+        os.unlink(temp)
+        raise
+
 
-        return Scene(objs=objs, window=window)
+def convert_scene(source: Path, target: Path):
+    '''Converts between scene formats, chosen by the files' extensions.'''
+    save_scene(load_scene(source), target)
 
 
-def load_scene(path: Path) -> Scene:
-    with open(path) as file:
-        contents = file.read()
-        return ObjCodec.decode(contents)
+def main():
+    parser = argparse.ArgumentParser(
+        description='Converts scenes between OBJ and the binary format.'
+    )
+    parser.add_argument('source')
+    parser.add_argument('target')
+    args = parser.parse_args()
+    convert_scene(args.source, args.target)
 
 
-def save_scene(scene: Scene, path: Path):
-    with open(path, 'w+') as file:
-        contents = ObjCodec.encode(scene)
-        file.write(contents)
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,11 @@
 '''Module for clipping methods.'''
 from enum import auto, Enum
-from typing import List, Optional
-import copy
+from typing import List, Optional, Sequence, Tuple
 
-from graphics import Line, Polygon, Vec2
+import numpy as np
+
+from graphics import ClippedGeometry, Curve, Line, Polygon
+from linalg import array_to_points, Point2
 
 
 class LineClippingMethod(Enum):
@@ -19,7 +21,7 @@ class CohenRegion:
     TOP = 0b1000
 
     @classmethod
-    def region_of(cls, v: Vec2) -> int:
+    def region_of(cls, v: Point2) -> int:
         region = CohenRegion.INSIDE
         if v.x < -1:
             region |= CohenRegion.LEFT
@@ -36,54 +38,125 @@ class CohenRegion:
 
 def cohen_sutherland_line_clip(
     line: Line
-) -> Optional[Line]:
-    new_line = copy.deepcopy(line)
-    start, end = new_line.vertices_ndc
+) -> Optional[ClippedGeometry]:
+    vertices = line.vertices_ndc
+    start, end = array_to_points(vertices)
     regions = [
         CohenRegion.region_of(v)
         for v in (start, end)
     ]
+    moved = False
 
     while True:
         # Both inside
         if all([r == CohenRegion.INSIDE for r in regions]):
-            return new_line
+            if moved:
+                vertices = np.array([start, end])
+            return ClippedGeometry(line, vertices)
         # Both outside (and in the same side)
         elif regions[0] & regions[1] != 0:
             return None
 
         clip_index = 0 if regions[0] != CohenRegion.INSIDE else 1
 
+        # The clipped endpoint lies past the boundary and the other one does
+        # not, so the delta along the boundary's axis is never zero.
         dx, dy, _ = end - start
-        m = dx / dy
 
         if regions[clip_index] & CohenRegion.TOP != 0:
-            x = start.x + m * (1 - start.y)
+            x = start.x + dx * (1 - start.y) / dy
             y = 1
         elif regions[clip_index] & CohenRegion.BOTTOM != 0:
-            x = start.x + m * (-1 - start.y)
+            x = start.x + dx * (-1 - start.y) / dy
             y = -1
         elif regions[clip_index] & CohenRegion.RIGHT != 0:
             x = 1
-            y = start.y + (1 - start.x) / m
+            y = start.y + dy * (1 - start.x) / dx
         elif regions[clip_index] & CohenRegion.LEFT != 0:
             x = -1
-            y = start.y + (-1 - start.x) / m
+            y = start.y + dy * (-1 - start.x) / dx
 
         if clip_index == 0:
-            start = Vec2(x, y)
-            new_line.vertices_ndc[0] = start
+            start = Point2(x, y)
             regions[0] = CohenRegion.region_of(start)
         else:
-            end = Vec2(x, y)
-            new_line.vertices_ndc[1] = end
+            end = Point2(x, y)
             regions[1] = CohenRegion.region_of(end)
+        moved = True
+
+
+def outcodes(points: np.ndarray) -> np.ndarray:
+    '''Cohen-Sutherland regions of an `(..., 3)` array of NDC points.'''
+    x = points[..., 0]
+    y = points[..., 1]
+
+    return (
+        (x < -1) * CohenRegion.LEFT
+        | (x > 1) * CohenRegion.RIGHT
+        | (y < -1) * CohenRegion.BOTTOM
+        | (y > 1) * CohenRegion.TOP
+    )
+
+
+def cohen_sutherland_clip_segments(
+    segments: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    '''Clips an `(M, 2, 3)` array of NDC segments against the unit square.
+
+    Returns a visibility mask of shape `(M,)` and the clipped segments. Rows
+    where the mask is False hold meaningless endpoints.'''
+    segments = np.array(segments, dtype=float)
+    codes = outcodes(segments)
+    visible = np.ones(len(segments), dtype=bool)
+
+    # Segments neither trivially accepted nor trivially rejected yet. Each
+    # round moves one endpoint of every survivor onto a boundary, so this
+    # runs at most four times.
+    active = np.arange(len(segments))
+    while active.size:
+        start_codes = codes[active, 0]
+        end_codes = codes[active, 1]
+
+        accept = (start_codes | end_codes) == CohenRegion.INSIDE
+        reject = (start_codes & end_codes) != 0
+        visible[active[reject]] = False
+
+        survivors = ~(accept | reject)
+        active = active[survivors]
+        if not active.size:
+            break
+
+        start_codes = start_codes[survivors]
+        clip_index = np.where(start_codes != CohenRegion.INSIDE, 0, 1)
+        region = np.where(clip_index == 0, start_codes, end_codes[survivors])
+
+        start = segments[active, 0]
+        delta = segments[active, 1] - start
+
+        # Same boundary priority as the scalar clipper: TOP, BOTTOM, RIGHT,
+        # LEFT. The delta along the chosen axis is never zero.
+        horizontal = region & (CohenRegion.TOP | CohenRegion.BOTTOM) != 0
+        y_bound = np.where(region & CohenRegion.TOP != 0, 1.0, -1.0)
+        x_bound = np.where(region & CohenRegion.RIGHT != 0, 1.0, -1.0)
+
+        axis = np.where(horizontal, 1, 0)
+        rows = np.arange(len(active))
+        bound = np.where(horizontal, y_bound, x_bound)
+        t = (bound - start[rows, axis]) / delta[rows, axis]
+
+        clipped = start + t[:, np.newaxis] * delta
+        clipped[rows, axis] = bound
+
+        segments[active, clip_index] = clipped
+        codes[active, clip_index] = outcodes(clipped)
+
+    return visible, segments
 
 
 def liang_barsky_line_clip(
     line: Line
-) -> Optional[Line]:
-    start, end = line.vertices_ndc
+) -> Optional[ClippedGeometry]:
+    start, end = array_to_points(line.vertices_ndc)
 
     p1 = start.x - end.x
     p2 = -p1
@@ -98,8 +171,8 @@ def liang_barsky_line_clip(
     posarr = [1.0 for _ in range(5)]
     negarr = [0.0 for _ in range(5)]
 
-    if (p1 == 0 and q1 < 0
-       or p3 == 0 and q3 < 0):
+    if (p1 == 0 and (q1 < 0 or q2 < 0)
+       or p3 == 0 and (q3 < 0 or q4 < 0)):
         return None
 
     if p1 != 0:
@@ -136,15 +209,60 @@ def liang_barsky_line_clip(
     xn2 = start.x + p2 * rn2
     yn2 = start.y + p4 * rn2
 
-    new_line = copy.deepcopy(line)
-    new_line.vertices_ndc = [Vec2(xn1, yn1), Vec2(xn2, yn2)]
-    return new_line
+    return ClippedGeometry(
+        line,
+        np.array([[xn1, yn1, 1], [xn2, yn2, 1]], dtype=float)
+    )
+
+
+def liang_barsky_t_ranges(
+    segments: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    '''Parametric range `[t0, t1]` of each segment of an `(M, 2, 3)` NDC
+    array that lies inside the unit square. The range is empty (t0 > t1)
+    for segments that miss it.'''
+    start = segments[:, 0, :2]
+    delta = segments[:, 1, :2] - start
+
+    # Columns are the left, bottom, right and top boundaries.
+    p = np.concatenate((-delta, delta), axis=1)
+    q = np.concatenate((start + 1, 1 - start), axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = q / p
+
+    t0 = np.max(np.where(p < 0, r, 0.0), axis=1)
+    t1 = np.min(np.where(p > 0, r, 1.0), axis=1)
+
+    # Parallel to a boundary and on its outer side.
+    outside = np.any((p == 0) & (q < 0), axis=1)
+    t0[outside] = 1.0
+    t1[outside] = 0.0
+
+    return t0, t1
+
+
+def liang_barsky_clip_segments(
+    segments: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    '''Clips an `(M, 2, 3)` array of NDC segments against the unit square.
+
+    Returns a visibility mask of shape `(M,)` and the clipped segments. Rows
+    where the mask is False hold meaningless endpoints.'''
+    segments = np.asarray(segments, dtype=float)
+    t0, t1 = liang_barsky_t_ranges(segments)
+
+    start = segments[:, 0, np.newaxis]
+    delta = segments[:, 1, np.newaxis] - start
+    t = np.stack((t0, t1), axis=1)[..., np.newaxis]
+
+    return t0 <= t1, start + t * delta
 
 
 def line_clip(
         line: Line,
         method=LineClippingMethod.COHEN_SUTHERLAND
-) -> Optional[Line]:
+) -> Optional[ClippedGeometry]:
     METHODS = {
         LineClippingMethod.COHEN_SUTHERLAND: cohen_sutherland_line_clip,
         LineClippingMethod.LIANG_BARSKY: liang_barsky_line_clip,
@@ -152,124 +270,149 @@ def line_clip(
     return METHODS[method](line)
 
 
-def poly_iter(vertices: List[Vec2]):
-    if not vertices:
-        return
-    v1 = vertices[0]
-    for v2 in vertices[1:]:
-        yield v1, v2
-        v1 = v2
-    yield v1, vertices[0]
-
-
-def poly_clip(poly: Polygon) -> Optional[Polygon]:
-    new_poly = copy.deepcopy(poly)
-
-    def clip_region(vertices, clipping_region):
-        clipped = []
-        for v1, v2 in poly_iter(vertices):
-            regions = [
-                CohenRegion.region_of(v) & clipping_region for v in [v1, v2]
-            ]
-
-            if all([region != clipping_region for region in regions]):
-                clipped.extend([v1, v2])
-            elif all([region == clipping_region for region in regions]):
-                continue
-            elif any([region == clipping_region for region in regions]):
-                clip_index = 0 if regions[0] == clipping_region else 1
-
-                dx, dy, _ = v2 - v1
-                m = dx / dy
-
-                if clipping_region == CohenRegion.TOP:
-                    x = v1.x + m * (1 - v1.y)
-                    y = 1
-                elif clipping_region == CohenRegion.BOTTOM:
-                    x = v1.x + m * (-1 - v1.y)
-                    y = -1
-                elif clipping_region == CohenRegion.RIGHT:
-                    x = 1
-                    y = v1.y + (1 - v1.x) / m
-                elif clipping_region == CohenRegion.LEFT:
-                    x = -1
-                    y = v1.y + (-1 - v1.x) / m
-
-                if clip_index == 0:
-                    v1 = Vec2(x, y)
-                else:
-                    v2 = Vec2(x, y)
-                clipped.extend([v1, v2])
-        return clipped
-
-    regions = [
-        CohenRegion.LEFT,
-        CohenRegion.TOP,
-        CohenRegion.RIGHT,
-        CohenRegion.BOTTOM
+def classify_bounds(
+    bounds: np.ndarray,
+    t_matrix: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    '''Masks of the `(K, 2, 2)` world boxes entirely inside and entirely
+    outside the window whose NDC matrix is `t_matrix`.'''
+    (xmin, ymin), (xmax, ymax) = bounds[:, 0].T, bounds[:, 1].T
+    corners = np.stack(
+        (
+            np.stack((xmin, ymin), axis=1),
+            np.stack((xmax, ymin), axis=1),
+            np.stack((xmax, ymax), axis=1),
+            np.stack((xmin, ymax), axis=1),
+        ),
+        axis=1
+    )
+    ndc = corners @ t_matrix[:2, :2] + t_matrix[2, :2]
+    ndc_min = ndc.min(axis=1)
+    ndc_max = ndc.max(axis=1)
+
+    inside = np.all((ndc_min >= -1) & (ndc_max <= 1), axis=1)
+    outside = np.any((ndc_min > 1) | (ndc_max < -1), axis=1)
+    return inside, outside
+
+
+# Segment kernels used to clip many lines at once.
+SEGMENT_CLIPPERS = {
+    LineClippingMethod.COHEN_SUTHERLAND: cohen_sutherland_clip_segments,
+    LineClippingMethod.LIANG_BARSKY: liang_barsky_clip_segments,
+}
+
+# Below this many lines the per-line clippers are cheaper than batching.
+BATCH_MIN_LINES = 8
+
+
+def clip_lines(
+    lines: Sequence[Line],
+    method=LineClippingMethod.COHEN_SUTHERLAND,
+) -> List[Optional[ClippedGeometry]]:
+    '''Clips many lines, using a segment kernel when there are enough of
+    them. Returns one result per line, None for the invisible ones.'''
+    if len(lines) < BATCH_MIN_LINES or method not in SEGMENT_CLIPPERS:
+        return [line_clip(line, method) for line in lines]
+
+    segments = np.stack([line.vertices_ndc for line in lines])
+    visible, segments = SEGMENT_CLIPPERS[method](segments)
+
+    return [
+        ClippedGeometry(line, segment) if is_visible else None
+        for line, is_visible, segment in zip(lines, visible, segments)
     ]
-    for region in regions:
-        new_poly.vertices_ndc = clip_region(
-            new_poly.vertices_ndc,
-            region
-        )
-
-    return new_poly
-
-
-def curve_clip(curve):
-    new_curve = copy.deepcopy(curve)
-
-    def clip_region(vertices, clipping_region):
-        clipped = []
-        for i in range(len(vertices) - 1):
-            v1 = vertices[i]
-            v2 = vertices[i + 1]
-
-            regions = [
-                CohenRegion.region_of(v) & clipping_region for v in [v1, v2]
-            ]
-
-            if all([region != clipping_region for region in regions]):
-                clipped.extend([v1, v2])
-            elif all([region == clipping_region for region in regions]):
-                continue
-            elif any([region == clipping_region for region in regions]):
-                clip_index = 0 if regions[0] == clipping_region else 1
-
-                dx, dy, _ = v2 - v1
-                m = dx / dy
-
-                if clipping_region == CohenRegion.TOP:
-                    x = v1.x + m * (1 - v1.y)
-                    y = 1
-                elif clipping_region == CohenRegion.BOTTOM:
-                    x = v1.x + m * (-1 - v1.y)
-                    y = -1
-                elif clipping_region == CohenRegion.RIGHT:
-                    x = 1
-                    y = v1.y + (1 - v1.x) / m
-                elif clipping_region == CohenRegion.LEFT:
-                    x = -1
-                    y = v1.y + (-1 - v1.x) / m
-
-                if clip_index == 0:
-                    v1 = Vec2(x, y)
-                else:
-                    v2 = Vec2(x, y)
-                clipped.extend([v1, v2])
-        return clipped
 
-    regions = [
-        CohenRegion.LEFT,
-        CohenRegion.TOP,
-        CohenRegion.RIGHT,
-        CohenRegion.BOTTOM
-    ]
-    for region in regions:
-        new_curve.vertices_ndc = clip_region(
-            new_curve.vertices_ndc,
-            region
-        )
 
-    return new_curve
+# Sutherland-Hodgman clip planes, as the axis and the bound a point's
+# coordinate must not go past.
+CLIP_PLANES = (
+    (0, -1.0),  # LEFT
+    (1, 1.0),   # TOP
+    (0, 1.0),   # RIGHT
+    (1, -1.0),  # BOTTOM
+)
+
+
+def clip_ring(ring: np.ndarray, axis: int, bound: float) -> np.ndarray:
+    '''One Sutherland-Hodgman stage: clips a closed `(n, 3)` NDC ring to the
+    side of `bound` on `axis` that contains the origin.
+
+    Every edge emits its intersection with the plane if it crosses it, then
+    its end vertex if that one is inside, so each output vertex appears
+    exactly once.'''
+    coords = ring[:, axis]
+    inside = coords <= bound if bound > 0 else coords >= bound
+    if inside.all():
+        return ring
+    if not inside.any():
+        return ring[:0]
+
+    ends = np.roll(ring, -1, axis=0)
+    ends_inside = np.roll(inside, -1)
+    crossing = inside != ends_inside
+
+    # One endpoint of a crossing edge is inside and the other is not, so the
+    # delta along `axis` is never zero.
+    starts = ring[crossing]
+    delta = ends[crossing] - starts
+    t = (bound - starts[:, axis]) / delta[:, axis]
+
+    emitted = np.empty((len(ring), 2, 3))
+    emitted[crossing, 0] = starts + t[:, np.newaxis] * delta
+    emitted[crossing, 0, axis] = bound
+    emitted[:, 1] = ends
+
+    return emitted[np.column_stack((crossing, ends_inside))]
+
+
+def poly_clip(poly: Polygon) -> Optional[ClippedGeometry]:
+    vertices = poly.vertices_ndc
+    for axis, bound in CLIP_PLANES:
+        vertices = clip_ring(vertices, axis, bound)
+        if not len(vertices):
+            return None
+
+    return ClippedGeometry(poly, vertices)
+
+
+def polyline_clip(
+    vertices: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    '''Returns the visible vertices of an NDC polyline and the index where
+    each visible run starts, or the polyline itself if nothing is clipped.'''
+    segments = np.stack((vertices[:-1], vertices[1:]), axis=1)
+    t0, t1 = liang_barsky_t_ranges(segments)
+    visible = t0 <= t1
+
+    continues = np.zeros(len(segments), dtype=bool)
+    continues[1:] = (
+        visible[:-1] & (t1[:-1] == 1) & visible[1:] & (t0[1:] == 0)
+    )
+    if continues[1:].all() and t0[0] == 0 and t1[-1] == 1:
+        return vertices, np.zeros(1, dtype=int)
+    opens_run = visible & ~continues
+
+    start = segments[:, 0, np.newaxis]
+    delta = segments[:, 1, np.newaxis] - start
+    t = np.stack((t0, t1), axis=1)[..., np.newaxis]
+
+    # Run openers also emit their clipped start.
+    emit = np.column_stack((opens_run, visible))
+    counts = emit.sum(axis=1)
+    runs = (np.cumsum(counts) - counts)[opens_run]
+
+    return (start + t * delta)[emit], runs
+
+
+def curve_clip(curve: Curve) -> Optional[ClippedGeometry]:
+    vertices = curve.vertices_ndc
+    if len(vertices) < 2:
+        return None
+
+    clipped, runs = polyline_clip(vertices)
+    if not len(clipped):
+        return None
+    if clipped is vertices:
+        return ClippedGeometry(curve, vertices)
+
+    return ClippedGeometry(curve, clipped, runs)
@@ -1,6 +1,11 @@
 '''Contains displayable object definitions.'''
-from abc import ABC, abstractmethod
-from typing import Any, Optional, List
+import logging
+from abc import ABC
+from collections import OrderedDict
+from enum import auto, Enum
+from functools import lru_cache
+from math import floor, log2
+from typing import Any, Callable, List, NamedTuple, Optional
 
 import numpy as np
 from cairo import Context
@@ -8,102 +13,293 @@ from cairo import Context
 from linalg import Vec2
 from transformations import (
     offset_matrix,
-    scale_matrix,
-    rotation_matrix,
+    rotation_about_matrix,
+    scale_about_matrix,
     ndc_matrix
 )
+from vertexstore import VertexStore
 
 np.set_printoptions(formatter={'float': lambda x: '{0:0.2f}'.format(x)})
 
+logger = logging.getLogger(__name__)
+
+
+class DrawStyle(Enum):
+    '''How an object's path is painted.'''
+    # Outlined, then filled.
+    FILL = auto()
+    STROKE = auto()
+    # Dots, filled only.
+    POINT = auto()
+
+    def paint(self, cr: Context):
+        '''Paints and clears the current path.'''
+        if self is DrawStyle.FILL:
+            cr.stroke_preserve()
+            cr.fill()
+        elif self is DrawStyle.POINT:
+            cr.fill()
+        else:
+            cr.stroke()
+
 
 class GraphicObject(ABC):
+    @property
+    def style(self) -> DrawStyle:
+        return DrawStyle.STROKE
+
     def __init__(self, vertices=[], name=''):
         super().__init__()
         self.name = name
-        self.vertices: List[Vec2] = vertices
-        self.vertices_ndc: List[Vec2] = vertices
+        # Private store until a Scene adopts the object into its own.
+        self._store = VertexStore.from_vertices(vertices)
+        self._offset = 0
+        self._length = self._store.used
+        # Called after the world geometry changes, e.g. by the owning Scene
+        # to keep its spatial index current.
+        self.on_change: Optional[Callable[['GraphicObject'], None]] = None
+        # Pending transform from stored to world coordinates, or None.
+        self._model: Optional[np.ndarray] = None
+        # Derived from the stored vertices, dropped by `changed`.
+        self._centroid: Optional[np.ndarray] = None
+        self._bounds: Optional[np.ndarray] = None
 
-    @abstractmethod
     def draw(
             self,
             cr: Context,
-            vp_matrix: np.ndarray
+            vp_matrix: np.ndarray,
+            vertices_ndc: Optional[np.ndarray] = None,
+            runs: Optional[np.ndarray] = None,
+    ):
+        '''Draws the object on its own, or the clipped `vertices_ndc`.'''
+        if vertices_ndc is None:
+            vertices_ndc = self.vertices_ndc
+
+        xy = (vertices_ndc @ vp_matrix)[:, :2].ravel().tolist()
+        self.trace(cr, xy, runs)
+        self.style.paint(cr)
+
+    def trace(
+        self,
+        cr: Context,
+        xy: List[float],
+        runs: Optional[np.ndarray] = None,
+    ):
+        '''Adds the object's outline to the current path, from its flat
+        `[x0, y0, x1, y1, ...]` viewport coordinates.'''
+        starts = [0] if runs is None else runs.tolist()
+        for start, end in zip(starts, starts[1:] + [len(xy) // 2]):
+            if start == end:
+                continue
+            coords = iter(xy[2 * start:2 * end])
+            cr.move_to(next(coords), next(coords))
+            for x, y in zip(coords, coords):
+                cr.line_to(x, y)
+
+    @property
+    def _span(self) -> slice:
+        return slice(self._offset, self._offset + self._length)
+
+    @property
+    def _local_vertices(self) -> np.ndarray:
+        '''Stored vertices, without the pending model transform.'''
+        return self._store.world[self._span]
+
+    @property
+    def vertices(self) -> np.ndarray:
+        '''World coordinates, as an `(n, dim)` view into the vertex store.'''
+        self.bake()
+        return self._store.world[self._span]
+
+    @vertices.setter
+    def vertices(self, value):
+        self._model = None
+        self._replace_vertices(value)
+
+    def _replace_vertices(self, value):
+        '''Replaces the stored vertices, keeping the pending model
+        transform.'''
+        value = np.asarray(value, dtype=float).reshape(-1, self._store.dim)
+        if len(value) != self._length:
+            self._store.release(self._offset, self._length)
+            self._offset = self._store.allocate(len(value))
+            self._length = len(value)
+        self._store.world[self._span] = value
+        self.changed()
+
+    @property
+    def vertices_ndc(self) -> np.ndarray:
+        return self._store.ndc[self._span]
+
+    def bind(self, store: VertexStore, offset: int):
+        '''Moves this object's vertices into `store`, starting at `offset`.'''
+        store.world[offset:offset + self._length] = self._local_vertices
+        store.ndc[offset:offset + self._length] = self._store.ndc[self._span]
+        self._store = store
+        self._offset = offset
+
+    def attach(
+        self,
+        store: VertexStore,
+        offset: int,
+        length: int,
+        bounds: Optional[np.ndarray] = None,
     ):
-        pass
+        '''Uses `length` rows of `store` from `offset` as this object's
+        vertices, without copying them.'''
+        self._store = store
+        self._offset = offset
+        self._length = length
+        self._model = None
+        self._centroid = None
+        self._bounds = bounds
+        if bounds is not None:
+            bounds.flags.writeable = False
+
+    def detach(self):
+        '''Moves this object's vertices back into a private store.'''
+        store = VertexStore.from_vertices(self._local_vertices)
+        store.ndc[:] = self._store.ndc[self._span]
+        self._store = store
+        self._offset = 0
+
+    def changed(self):
+        '''Call after writing into `vertices` in place.'''
+        self._centroid = None
+        self._bounds = None
+        self._notify()
+
+    def _notify(self):
+        if self.on_change is not None:
+            self.on_change(self)
+
+    def bake(self):
+        '''Applies the pending model transform to the stored vertices.'''
+        if self._model is None:
+            return
+        vertices = self._local_vertices
+        vertices[:] = vertices @ self._model
+        self._model = None
+        self._centroid = None
+        self._bounds = None
+
+    def with_model(self, matrix: np.ndarray) -> np.ndarray:
+        '''Composes the pending model transform before `matrix`.'''
+        if self._model is None:
+            return matrix
+        return self._model @ matrix
+
+    def _mean(self) -> np.ndarray:
+        if self._centroid is None:
+            self._centroid = self._local_vertices.mean(axis=0)
+            self._centroid.flags.writeable = False
+        if self._model is None:
+            return self._centroid
+        # Affine maps preserve means.
+        return self._centroid @ self._model
 
     @property
     def centroid(self):
-        return sum(self.vertices) / len(self.vertices)
+        return self._mean().view(Vec2)
+
+    def bounds(self) -> np.ndarray:
+        '''World-space bounding box, as `[[xmin, ymin], [xmax, ymax]]`.'''
+        if self._bounds is None:
+            xy = self._local_vertices[:, :2]
+            if len(xy):
+                self._bounds = np.array([xy.min(axis=0), xy.max(axis=0)])
+            else:
+                self._bounds = np.full((2, 2), np.nan)
+            self._bounds.flags.writeable = False
+        if self._model is None:
+            return self._bounds
+        if self._store.dim != 3:
+            xy = (self._local_vertices @ self._model)[:, :2]
+            return np.array([xy.min(axis=0), xy.max(axis=0)])
+
+        (xmin, ymin), (xmax, ymax) = self._bounds
+        corners = np.array(
+            [
+                [xmin, ymin, 1],
+                [xmax, ymin, 1],
+                [xmax, ymax, 1],
+                [xmin, ymax, 1],
+            ]
+        ) @ self._model
+        xy = corners[:, :2]
+        return np.array([xy.min(axis=0), xy.max(axis=0)])
 
     def update_ndc(self, window: 'Window'):
-        t_matrix = ndc_matrix(window)
-        self.vertices_ndc = [v @ t_matrix for v in self.vertices]
+        t_matrix = self.with_model(ndc_matrix(window))
+        self._store.ndc[self._span] = self._local_vertices @ t_matrix
 
     def transform(self, matrix: np.ndarray):
-        self.vertices = [v @ matrix for v in self.vertices]
+        '''Composes `matrix` into the pending model transform.'''
+        self._model = matrix if self._model is None else self._model @ matrix
+        self._notify()
 
     def translate(self, offset: Vec2):
         self.transform(offset_matrix(offset.x, offset.y))
 
     def scale(self, factor: Vec2):
-        cx = self.centroid.x
-        cy = self.centroid.y
-        t_matrix = (
-            offset_matrix(-cx, -cy) @
-            scale_matrix(factor.x, factor.y) @
-            offset_matrix(cx, cy)
-        )
-        self.transform(t_matrix)
+        cx, cy = self.centroid[:2]
+        self.transform(scale_about_matrix(factor.x, factor.y, cx, cy))
 
     def rotate(self, angle: float, reference: Vec2):
-        refx = reference.x
-        refy = reference.y
-        t_matrix = (
-            offset_matrix(-refx, -refy)
-            @ rotation_matrix(angle)
-            @ offset_matrix(refx, refy)
+        self.transform(
+            rotation_about_matrix(angle, reference.x, reference.y)
         )
-        self.transform(t_matrix)
 
     def clipped(
         self,
         method: Optional[Any] = None,
-    ) -> Optional['GraphicObject']:
-        return self
+    ) -> Optional['ClippedGeometry']:
+        return ClippedGeometry(self, self.vertices_ndc)
+
+
+class ClippedGeometry(NamedTuple):
+    '''Clipped NDC vertices of `source`, split into pieces at `runs`.'''
+    source: GraphicObject
+    vertices_ndc: np.ndarray
+    runs: Optional[np.ndarray] = None
+
+    def draw(self, cr: Context, vp_matrix: np.ndarray):
+        self.source.draw(cr, vp_matrix, self.vertices_ndc, self.runs)
 
 
 class Point(GraphicObject):
+    @property
+    def style(self) -> DrawStyle:
+        return DrawStyle.POINT
+
     def __init__(self, pos: Vec2, name=''):
         super().__init__(vertices=[pos], name=name)
 
     @property
     def pos(self) -> Vec2:
-        return self.vertices[0]
+        return self.vertices[0].view(Vec2)
 
     @pos.setter
     def pos(self, value: Vec2):
         self.vertices[0] = value
+        self.changed()
 
-    def draw(
-            self,
-            cr: Context,
-            vp_matrix: np.ndarray
+    def trace(
+        self,
+        cr: Context,
+        xy: List[float],
+        runs: Optional[np.ndarray] = None,
     ):
-        pos_vp = self.vertices_ndc[0] @ vp_matrix
-        cr.move_to(pos_vp.x, pos_vp.y)
-        cr.arc(pos_vp.x, pos_vp.y, 1, 0, 2 * np.pi)
-        cr.fill()
-
-    def clipped(self, *args, **kwargs) -> Optional['Point']:
-        pos = self.vertices_ndc[0]
-
-        return (
-            self if (pos.x >= -1
-                     and pos.x <= 1
-                     and pos.y >= -1
-                     and pos.y <= 1)
-            else None
-        )
+        x, y = xy[0], xy[1]
+        cr.new_sub_path()
+        cr.arc(x, y, 1, 0, 2 * np.pi)
+
+    def clipped(self, *args, **kwargs) -> Optional[ClippedGeometry]:
+        x, y, _ = self.vertices_ndc[0]
+
+        if -1 <= x <= 1 and -1 <= y <= 1:
+            return ClippedGeometry(self, self.vertices_ndc)
+        return None
 
 
 class Line(GraphicObject):
@@ -111,32 +307,27 @@ class Line(GraphicObject):
         super().__init__(vertices=[start, end], name=name)
 
     @property
-    def start(self):
-        return self.vertices[0]
+    def start(self) -> Vec2:
+        return self.vertices[0].view(Vec2)
 
     @start.setter
     def start(self, value: Vec2):
         self.vertices[0] = value
+        self.changed()
 
     @property
-    def end(self):
-        return self.vertices[1]
+    def end(self) -> Vec2:
+        return self.vertices[1].view(Vec2)
 
     @end.setter
     def end(self, value: Vec2):
         self.vertices[1] = value
-
-    def draw(self, cr: Context, vp_matrix: np.ndarray):
-        start_vp, end_vp = [v @ vp_matrix for v in self.vertices_ndc]
-
-        cr.move_to(start_vp.x, start_vp.y)
-        cr.line_to(end_vp.x, end_vp.y)
-        cr.stroke()
+        self.changed()
 
     def clipped(
         self,
         method: Optional['LineClippingMethod'] = None,
-    ) -> Optional[GraphicObject]:
+    ) -> Optional[ClippedGeometry]:
         from clipping import line_clip
 
         return line_clip(self, method)
@@ -147,80 +338,258 @@ class Polygon(GraphicObject):
         super().__init__(vertices=vertices, name=name)
         self.filled = filled
 
-    def draw(
-            self,
-            cr: Context,
-            vp_matrix: np.ndarray
+    @property
+    def style(self) -> DrawStyle:
+        return DrawStyle.FILL if self.filled else DrawStyle.STROKE
+
+    def trace(
+        self,
+        cr: Context,
+        xy: List[float],
+        runs: Optional[np.ndarray] = None,
     ):
-        for v in self.vertices_ndc:
-            next_vp = v @ vp_matrix
-            cr.line_to(next_vp.x, next_vp.y)
+        if not xy:
+            return
+        coords = iter(xy)
+        cr.move_to(next(coords), next(coords))
+        for x, y in zip(coords, coords):
+            cr.line_to(x, y)
         cr.close_path()
 
-        if self.filled:
-            cr.stroke_preserve()
-            cr.fill()
-        else:
-            cr.stroke()
-
-    def clipped(self, *args, **kwargs) -> Optional['Polygon']:
+    def clipped(self, *args, **kwargs) -> Optional[ClippedGeometry]:
         from clipping import poly_clip
 
         return poly_clip(self)
 
 
 class Curve(GraphicObject):
-    def __init__(self, vertices, name=''):
+    '''Open polyline, optionally tessellated from the control points of a
+    piecewise cubic curve.'''
+
+    # Tessellations kept per curve, one per tolerance bucket.
+    LOD_CACHE_SIZE = 8
+    # Upper bound on the steps per segment, reached only when zoomed far in.
+    MAX_STEPS = 1024
+
+    def __init__(
+        self,
+        vertices,
+        name='',
+        control_points: Optional[np.ndarray] = None,
+        curve_type: Optional[str] = None,
+    ):
         super().__init__(vertices=vertices, name=name)
+        # `(m, 3)` control points, in the same space as the stored vertices.
+        self.control_points = control_points
+        self.curve_type = curve_type
+        self._lods: 'OrderedDict[int, np.ndarray]' = OrderedDict()
+        self._lod: Optional[int] = None
+
+    @property
+    def vertices(self) -> np.ndarray:
+        return super().vertices
+
+    @vertices.setter
+    def vertices(self, value):
+        # Explicit vertices turn the curve into a plain polyline.
+        self.control_points = None
+        self._lods.clear()
+        self._lod = None
+        self._model = None
+        self._replace_vertices(value)
 
     @classmethod
-    def from_control_points(
+    def segment_geometry(
         cls,
-        control_points,
+        control_points: np.ndarray,
         type='bezier',
-        name='',
-        n_points=20
-    ):
-        proj_x = np.array([v.x for v in control_points], dtype=float)
-        proj_y = np.array([v.y for v in control_points], dtype=float)
+    ) -> np.ndarray:
+        '''`(segments, 4, 2)` control points of every cubic segment, from
+        an `(m, 3)` array of homogeneous control points.'''
+        xy = control_points[:, :2]
 
-        vertices = []
         if type == 'bezier':
-            for i in range(0, len(control_points) - 1, 3):
-                for t in np.linspace(0, 1, n_points):
-                    T = np.array([t**3, t**2, t, 1], dtype=float)
-                    M = T @ cls.bezier_matrix()
-                    x = M @ proj_x[i:i + 4]
-                    y = M @ proj_y[i:i + 4]
-                    vertices.append(Vec2(x, y))
+            # Consecutive segments share an end point: segment i uses
+            # control points 3i to 3i + 3.
+            n_segments = max((len(xy) - 1) // 3, 0)
+            starts = 3 * np.arange(n_segments)
         elif type == 'b-spline':
-            for i in range(0, len(control_points) - 3):
-                Gbs_x = proj_x[i:i + 4]
-                Gbs_y = proj_y[i:i + 4]
+            # Segment i uses control points i to i + 3.
+            n_segments = max(len(xy) - 3, 0)
+            starts = np.arange(n_segments)
+        else:
+            raise ValueError(f'unknown curve type: {type}')
+
+        return xy[starts[:, np.newaxis] + np.arange(4)]
 
-                Cx = cls.bspline_matrix() @ Gbs_x
-                Cy = cls.bspline_matrix() @ Gbs_y
+    @classmethod
+    def basis_matrix(cls, type='bezier') -> np.ndarray:
+        '''Matrix taking a segment's control points to the coefficients of
+        its `[t^3, t^2, t, 1]` polynomial.'''
+        if type == 'bezier':
+            return cls.bezier_matrix()
+        return cls.bspline_matrix()
 
-                Dx = cls.fd_matrix(1.0 / n_points) @ Cx
-                Dy = cls.fd_matrix(1.0 / n_points) @ Cy
+    @classmethod
+    def from_control_points(
+        cls,
+        control_points,
+        type='bezier',
+        name='',
+        n_points=20
+    ):
+        control_points = np.array(
+            [(v[0], v[1], 1.0) for v in control_points],
+            dtype=float
+        ).reshape(-1, 3)
 
-                for k in range(n_points + 1):
-                    x = Dx[0]
-                    y = Dy[0]
-                    print(f'{k}:')
-                    print(f'\tx={x}')
-                    print(f'\ty={y}')
+        return cls(
+            cls.fixed_vertices(control_points, type, n_points),
+            name=name,
+            control_points=control_points,
+            curve_type=type,
+        )
 
-                    Dx = Dx + np.append(Dx[1:], 0)
-                    Dy = Dy + np.append(Dy[1:], 0)
+    @classmethod
+    def fixed_vertices(
+        cls,
+        control_points: np.ndarray,
+        type='bezier',
+        n_points=20,
+    ) -> np.ndarray:
+        '''Tessellates every segment into `n_points` evenly spaced samples
+        for Bezier curves, `n_points + 1` for B-splines.'''
+        geometry = cls.segment_geometry(control_points, type)
+        n_segments = len(geometry)
 
-                    vertices.append(Vec2(x, y))
+        if type == 'bezier':
+            # (n_points, 4) @ (segments, 4, 2) -> (segments, n_points, 2)
+            xy = (cls.bezier_basis(n_points) @ geometry).reshape(-1, 2)
+        else:
+            # Initial forward differences [f, df, d2f, d3f] of every
+            # segment, shape (segments, 4, 2).
+            differences = (
+                cls.fd_matrix(1.0 / n_points)
+                @ cls.bspline_matrix()
+                @ geometry
+            )
+
+            xy = np.empty((n_segments, n_points + 1, 2))
+            for k in range(n_points + 1):
+                xy[:, k] = differences[:, 0]
+                differences[:, :3] += differences[:, 1:]
+
+            xy = xy.reshape(-1, 2)
+            if logger.isEnabledFor(logging.DEBUG):
+                for k, (x, y) in enumerate(xy):
+                    logger.debug(
+                        'b-spline sample %d: x=%s y=%s',
+                        k % (n_points + 1), x, y
+                    )
+
+        return np.column_stack((xy, np.ones(len(xy))))
 
-        return cls(vertices, name=name)
+    @classmethod
+    def adaptive_vertices(
+        cls,
+        control_points: np.ndarray,
+        type: str,
+        tolerance: float,
+    ) -> np.ndarray:
+        '''Tessellates the curve so that no chord strays more than
+        `tolerance` from it.'''
+        geometry = cls.segment_geometry(control_points, type)
+        if not len(geometry):
+            return np.empty((0, 3))
+
+        # (segments, 4, 2) coefficients of t^3, t^2, t and 1.
+        coefficients = cls.basis_matrix(type) @ geometry
+        a, b = coefficients[:, 0], coefficients[:, 1]
+        # Chords over steps of h stray at most max|f''| * h^2 / 8.
+        curvature = np.maximum(
+            np.linalg.norm(2 * b, axis=1),
+            np.linalg.norm(6 * a + 2 * b, axis=1),
+        )
+        steps = np.sqrt(curvature / (8 * tolerance))
+        steps = np.clip(np.ceil(steps), 1, cls.MAX_STEPS).astype(int)
+
+        # Samples t = k / steps for k in 1..steps of every segment, after
+        # the curve's start point.
+        segment = np.repeat(np.arange(len(steps)), steps)
+        first = np.cumsum(steps) - steps
+        t = (np.arange(len(segment)) - first[segment] + 1) / steps[segment]
+        t = t[:, np.newaxis]
+
+        a, b, c, d = (coefficients[segment, i] for i in range(4))
+        xy = np.concatenate(
+            (coefficients[:1, 3], ((a * t + b) * t + c) * t + d)
+        )
+        return np.column_stack((xy, np.ones(len(xy))))
+
+    def tessellate(self, tolerance: float) -> bool:
+        '''Switches to a tessellation accurate to `tolerance` world units.
+        Returns whether the vertices changed.'''
+        if self.control_points is None or tolerance <= 0:
+            return False
+        assert self.curve_type is not None
+
+        if self._model is not None:
+            # The control points are pre-model; undo the model's scaling.
+            tolerance /= np.sqrt(abs(np.linalg.det(self._model[:2, :2])))
+        lod = floor(log2(tolerance))
+        if lod == self._lod:
+            self._lods.move_to_end(lod)
+            return False
+
+        vertices = self._lods.get(lod)
+        if vertices is None:
+            vertices = self.adaptive_vertices(
+                self.control_points, self.curve_type, 2.0 ** lod
+            )
+            self._lods[lod] = vertices
+            if len(self._lods) > self.LOD_CACHE_SIZE:
+                self._lods.popitem(last=False)
+        self._lods.move_to_end(lod)
+
+        self._lod = lod
+        self._replace_vertices(vertices)
+        return True
+
+    def ensure_tessellated(self) -> bool:
+        '''Tessellates a curve loaded without vertices. Returns whether the
+        vertices changed.'''
+        if self.control_points is None or self._length:
+            return False
+
+        self._replace_vertices(
+            self.fixed_vertices(self.control_points, self.curve_type)
+        )
+        return True
+
+    def bounds(self) -> np.ndarray:
+        '''For parametric curves, the box around the control points.'''
+        if self.control_points is None:
+            return super().bounds()
+
+        points = self.control_points
+        if self._model is not None:
+            points = points @ self._model
+        if not len(points):
+            return np.full((2, 2), np.nan)
+        xy = points[:, :2]
+        return np.array([xy.min(axis=0), xy.max(axis=0)])
+
+    def bake(self):
+        if self._model is not None and self.control_points is not None:
+            self.control_points = self.control_points @ self._model
+            self._lods.clear()
+            self._lod = None
+        super().bake()
 
     @classmethod
+    @lru_cache(maxsize=None)
     def bezier_matrix(cls):
-        return np.array(
+        matrix = np.array(
             [
                 -1, 3, -3, 1,
                 3, -6, 3, 0,
@@ -229,10 +598,24 @@ class Curve(GraphicObject):
             ],
             dtype=float
         ).reshape(4, 4)
+        matrix.flags.writeable = False
+        return matrix
 
     @classmethod
+    @lru_cache(maxsize=32)
+    def bezier_basis(cls, n_points: int) -> np.ndarray:
+        '''`(n_points, 4)` Bernstein weights of the four control points at
+        `n_points` evenly spaced values of t in [0, 1].'''
+        t = np.linspace(0, 1, n_points)
+        basis = np.column_stack((t**3, t**2, t, np.ones(n_points)))
+        basis = basis @ cls.bezier_matrix()
+        basis.flags.writeable = False
+        return basis
+
+    @classmethod
+    @lru_cache(maxsize=None)
     def bspline_matrix(cls):
-        return np.array(
+        matrix = np.array(
             [
                 -1, 3, -3, 1,
                 3, -6, 3, 0,
@@ -241,10 +624,13 @@ class Curve(GraphicObject):
             ],
             dtype=float
         ).reshape(4, 4) / 6
+        matrix.flags.writeable = False
+        return matrix
 
     @classmethod
+    @lru_cache(maxsize=32)
     def fd_matrix(cls, delta):
-        return np.array(
+        matrix = np.array(
             [
                 0, 0, 0, 1,
                 delta**3, delta**2, delta, 0,
@@ -253,14 +639,10 @@ class Curve(GraphicObject):
             ],
             dtype=float
         ).reshape(4, 4)
+        matrix.flags.writeable = False
+        return matrix
 
-    def draw(self, cr: Context, vp_matrix: np.ndarray):
-        for i in range(len(self.vertices_ndc)):
-            next_vp = self.vertices_ndc[i] @ vp_matrix
-            cr.line_to(next_vp.x, next_vp.y)
-        cr.stroke()
-
-    def clipped(self, *args, **kwargs):
+    def clipped(self, *args, **kwargs) -> Optional[ClippedGeometry]:
         from clipping import curve_clip
         return curve_clip(self)
 
@@ -271,19 +653,21 @@ class Rect(GraphicObject):
 
     @property
     def min(self) -> Vec2:
-        return self.vertices[0]
+        return self.vertices[0].view(Vec2)
 
     @min.setter
     def min(self, value: Vec2):
         self.vertices[0] = value
+        self.changed()
 
     @property
     def max(self) -> Vec2:
-        return self.vertices[1]
+        return self.vertices[1].view(Vec2)
 
     @max.setter
     def max(self, value: Vec2):
         self.vertices[1] = value
+        self.changed()
 
     @property
     def width(self) -> float:
@@ -296,7 +680,9 @@ class Rect(GraphicObject):
     def draw(
         self,
         cr: Context,
-        vp_matrix: np.ndarray
+        vp_matrix: np.ndarray,
+        vertices_ndc: Optional[np.ndarray] = None,
+        runs: Optional[np.ndarray] = None,
     ):
         _min = self.min
         _max = self.max
@@ -323,3 +709,12 @@ class Window(Rect):
     def __init__(self, min: Vec2, max: Vec2, angle: float = 0.0):
         super().__init__(min, max)
         self.angle = angle
+
+    def bounds(self) -> np.ndarray:
+        '''World-space bounding box of the rotated window.'''
+        corners = np.array(
+            [[-1, -1, 1], [1, -1, 1], [1, 1, 1], [-1, 1, 1]],
+            dtype=float
+        ) @ np.linalg.inv(ndc_matrix(self))
+        xy = corners[:, :2]
+        return np.array([xy.min(axis=0), xy.max(axis=0)])
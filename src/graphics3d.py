@@ -1,6 +1,7 @@
 '''3D graphics API.'''
 import math
 from dataclasses import dataclass
+from typing import List, Optional
 
 import numpy as np
 from cairo import Context
@@ -28,6 +29,10 @@ class Window3D:
 
 
 class GraphicObject3D(GraphicObject):
+    @property
+    def centroid(self):
+        return self._mean().view(Vec3)
+
     def translate(self, offset: Vec3):
         self.transform(offset_matrix_3d(offset))
 
@@ -48,13 +53,13 @@ class GraphicObject3D(GraphicObject):
             @ offset_matrix_3d(reference)
         )
 
-    def draw(
+    def trace(
         self,
         cr: Context,
-        vp_matrix: np.ndarray,
+        xy: List[float],
+        runs: Optional[np.ndarray] = None,
     ):
-        self.filled = False
-        Polygon.draw(self, cr, vp_matrix)
+        Polygon.trace(self, cr, xy)
 
     def update_ndc(self, window: Window3D):
         vpn = Vec3(0, 0, 1)
@@ -69,8 +74,8 @@ class GraphicObject3D(GraphicObject):
             @ y_rotation_matrix_3d(vpn_angle.y)
         )
 
-        v = [v @ v_t_matrix for v in self.vertices]
-        v = [Vec2(v.x, v.y) for v in v]
+        v = self._local_vertices @ self.with_model(v_t_matrix)
+        v = np.column_stack((v[:, 0], v[:, 1], np.ones(len(v))))
 
         t_matrix = ndc_matrix(window)
-        self.vertices_ndc = [v @ t_matrix for v in v]
+        self._store.ndc[self._span] = v @ t_matrix
@@ -1,5 +1,5 @@
 '''Linear Algebra functions and definitions.'''
-from typing import Callable
+from typing import Callable, List, Sequence, Union, cast
 
 import numpy as np
 
@@ -44,6 +44,119 @@ class Vec3(np.ndarray):
         return self[2]
 
 
+class Point2:
+    '''Slotted `Vec2` stand-in for scalar code paths.'''
+    __slots__ = ('x', 'y')
+
+    def __init__(self, x: float = 0.0, y: float = 0.0):
+        self.x = x
+        self.y = y
+
+    def __repr__(self) -> str:
+        return f'Point2({self.x}, {self.y})'
+
+    def __eq__(self, other) -> bool:
+        return (
+            isinstance(other, Point2)
+            and self.x == other.x and self.y == other.y
+        )
+
+    def __len__(self) -> int:
+        return 3
+
+    def __getitem__(self, i):
+        return (self.x, self.y, 1.0)[i]
+
+    def __iter__(self):
+        yield self.x
+        yield self.y
+        yield 1.0
+
+    def __add__(self, other: 'Point2') -> 'Point2':
+        return Point2(self.x + other[0], self.y + other[1])
+
+    def __sub__(self, other: 'Point2') -> 'Point2':
+        return Point2(self.x - other[0], self.y - other[1])
+
+    def __mul__(self, factor: float) -> 'Point2':
+        return Point2(self.x * factor, self.y * factor)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, divisor: float) -> 'Point2':
+        return Point2(self.x / divisor, self.y / divisor)
+
+    def __neg__(self) -> 'Point2':
+        return Point2(-self.x, -self.y)
+
+
+class Point3:
+    '''Lightweight 3D point, the `Vec3` counterpart of `Point2`.'''
+    __slots__ = ('x', 'y', 'z')
+
+    def __init__(self, x: float = 0.0, y: float = 0.0, z: float = 0.0):
+        self.x = x
+        self.y = y
+        self.z = z
+
+    def __repr__(self) -> str:
+        return f'Point3({self.x}, {self.y}, {self.z})'
+
+    def __eq__(self, other) -> bool:
+        return (
+            isinstance(other, Point3)
+            and self.x == other.x and self.y == other.y
+            and self.z == other.z
+        )
+
+    def __len__(self) -> int:
+        return 4
+
+    def __getitem__(self, i):
+        return (self.x, self.y, self.z, 1.0)[i]
+
+    def __iter__(self):
+        yield self.x
+        yield self.y
+        yield self.z
+        yield 1.0
+
+    def __add__(self, other: 'Point3') -> 'Point3':
+        return Point3(
+            self.x + other[0], self.y + other[1], self.z + other[2]
+        )
+
+    def __sub__(self, other: 'Point3') -> 'Point3':
+        return Point3(
+            self.x - other[0], self.y - other[1], self.z - other[2]
+        )
+
+    def __mul__(self, factor: float) -> 'Point3':
+        return Point3(self.x * factor, self.y * factor, self.z * factor)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, divisor: float) -> 'Point3':
+        return Point3(self.x / divisor, self.y / divisor, self.z / divisor)
+
+    def __neg__(self) -> 'Point3':
+        return Point3(-self.x, -self.y, -self.z)
+
+
+def points_to_array(points: Sequence[Union[Point2, Point3]]) -> np.ndarray:
+    '''Stacks points into an `(n, 3)` or `(n, 4)` homogeneous array.'''
+    if points and isinstance(points[0], Point3):
+        points3 = cast(Sequence[Point3], points)
+        return np.array([(p.x, p.y, p.z, 1.0) for p in points3], dtype=float)
+    return np.array([(p.x, p.y, 1.0) for p in points], dtype=float)
+
+
+def array_to_points(array: np.ndarray) -> List[Point2]:
+    '''Splits an `(n, 3)` homogeneous array into 2D points.'''
+    x, y = array[:, :2].T.tolist()
+    return list(map(Point2, x, y))
+
+
 TransformType = Callable[[Vec2], Vec2]
 
 
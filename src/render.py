@@ -0,0 +1,608 @@
+'''Drawing of clipped scene geometry with cairo.'''
+import argparse
+import sys
+from collections import OrderedDict
+from math import floor
+from pathlib import Path
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import cairo
+import numpy as np
+from cairo import Context
+
+from cgcodecs import load_scene
+from clipping import LineClippingMethod
+from graphics import ClippedGeometry, DrawStyle, Rect, Vec2, Window
+from scene import Scene
+from spatial import Box, overlapping
+from transformations import ndc_matrix, viewport_matrix
+
+# Filled shapes go first, so that outlines and dots stay on top of them.
+PAINT_ORDER = (DrawStyle.FILL, DrawStyle.STROKE, DrawStyle.POINT)
+
+LINE_WIDTH = 2.0
+COLOR = (0.8, 0.0, 0.0)
+
+
+def _spans(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    '''Every index of the ranges `start:end`, concatenated.'''
+    counts = ends - starts
+    firsts = np.cumsum(counts) - counts
+    return np.arange(counts.sum()) + np.repeat(starts - firsts, counts)
+
+
+def signed_areas(
+    points: np.ndarray,
+    starts: np.ndarray,
+    ends: np.ndarray,
+) -> np.ndarray:
+    '''Twice the signed area of each non-empty polygon `points[start:end]`,
+    positive when counterclockwise.'''
+    if not len(starts):
+        return np.empty(0)
+
+    rows = _spans(starts, ends)
+    lasts = np.cumsum(ends - starts) - 1
+    following = rows + 1
+    following[lasts] = starts
+
+    x, y = points[rows, 0], points[rows, 1]
+    cross = x * points[following, 1] - points[following, 0] * y
+    return np.add.reduceat(cross, np.concatenate(([0], lasts[:-1] + 1)))
+
+
+def draw_clipped(
+    cr: Context,
+    clipped: Sequence[ClippedGeometry],
+    vp_matrix: np.ndarray,
+):
+    '''Draws the clipped geometry of a frame, one path per `DrawStyle`.'''
+    if not clipped:
+        return
+
+    counts = np.array([len(geometry.vertices_ndc) for geometry in clipped])
+    ends = np.cumsum(counts)
+    starts = ends - counts
+    points = (
+        np.concatenate([geometry.vertices_ndc for geometry in clipped])
+        @ vp_matrix
+    )[:, :2]
+
+    groups: Dict[DrawStyle, List[int]] = {style: [] for style in DrawStyle}
+    for i, (geometry, count) in enumerate(zip(clipped, counts.tolist())):
+        if count:
+            groups[geometry.source.style].append(i)
+
+    filled = groups[DrawStyle.FILL]
+    if filled:
+        clockwise = signed_areas(points, starts[filled], ends[filled]) < 0
+        # Same orientation, so overlaps add up under the nonzero rule.
+        if clockwise.any():
+            flip_starts = starts[filled][clockwise]
+            flip_ends = ends[filled][clockwise]
+            rows = _spans(flip_starts, flip_ends)
+            order = np.arange(len(points))
+            order[rows] = np.repeat(
+                flip_starts + flip_ends - 1,
+                flip_ends - flip_starts,
+            ) - rows
+            points = points[order]
+
+    # Plain floats, flattened: much cheaper to make than a list per vertex.
+    xy = points.ravel().tolist()
+    starts, ends = (2 * starts).tolist(), (2 * ends).tolist()
+    for style in PAINT_ORDER:
+        if not groups[style]:
+            continue
+        for i in groups[style]:
+            clipped[i].source.trace(
+                cr,
+                xy[starts[i]:ends[i]],
+                clipped[i].runs,
+            )
+        style.paint(cr)
+
+
+def padded(region: Rect) -> Rect:
+    '''`region` widened by the line width on every side.'''
+    return Rect(
+        Vec2(region.min.x - LINE_WIDTH, region.min.y - LINE_WIDTH),
+        Vec2(region.max.x + LINE_WIDTH, region.max.y + LINE_WIDTH),
+    )
+
+
+def region_window(
+    window: Window,
+    vp_matrix: np.ndarray,
+    region: Rect,
+) -> Window:
+    '''The window that shows, on a viewport covering `region`, what
+    `window` shows on the part `region` of the viewport of `vp_matrix`.'''
+    (x0, y0, _), (x1, y1, _) = region.vertices.tolist()
+    corners = np.array([[x0, y0, 1], [x1, y1, 1]]) @ np.linalg.inv(vp_matrix)
+    (u0, v0, _), (u1, v1, _) = corners.tolist()
+
+    center = np.array([(u0 + u1) / 2, (v0 + v1) / 2, 1]) @ np.linalg.inv(
+        ndc_matrix(window)
+    )
+    half_width = window.width * abs(u1 - u0) / 4
+    half_height = window.height * abs(v1 - v0) / 4
+    cx, cy, _ = center.tolist()
+    return Window(
+        Vec2(cx - half_width, cy - half_height),
+        Vec2(cx + half_width, cy + half_height),
+        angle=window.angle,
+    )
+
+
+def draw_region(
+    cr: Context,
+    scene: Scene,
+    method: LineClippingMethod,
+    vp_matrix: np.ndarray,
+    region: Rect,
+):
+    '''Clears and draws the part `region` of the frame that `vp_matrix`
+    maps the scene's window to.'''
+    assert scene.window is not None
+    # Outlines just outside the region still cover some of its pixels.
+    widened = padded(region)
+
+    cr.save()
+    cr.rectangle(region.min.x, region.min.y, region.width, region.height)
+    cr.clip()
+    cr.set_operator(cairo.OPERATOR_CLEAR)
+    cr.paint()
+    cr.set_operator(cairo.OPERATOR_OVER)
+    cr.set_line_width(LINE_WIDTH)
+    cr.set_source_rgb(*COLOR)
+
+    window = region_window(scene.window, vp_matrix, widened)
+    with scene.viewed_through(window):
+        draw_clipped(
+            cr,
+            scene.clip_objects(method, viewport_width=widened.width),
+            viewport_matrix(widened),
+        )
+    cr.restore()
+
+
+class TileCache:
+    '''LRU cache of rendered `TILE_SIZE` tiles of a scene, keyed by zoom,
+    rotation, sub-pixel offset, clipping method and position.'''
+
+    TILE_SIZE = 256
+
+    def __init__(self, max_bytes: int = 256 << 20):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        # Surface and world box of each tile, least recently used first.
+        self.tiles: 'OrderedDict[Hashable, Tuple[cairo.ImageSurface, Box]]' = (
+            OrderedDict()
+        )
+        self.scene: Optional[Scene] = None
+        # Boxes reported by the scene since the last draw, or None when
+        # every tile must go.
+        self._edits: Optional[List[Box]] = []
+
+    def clear(self):
+        self.tiles.clear()
+        self.bytes = 0
+
+    def _edited(self, box: Optional[Box]):
+        if box is None:
+            self._edits = None
+        elif self._edits is not None:
+            self._edits.append(box)
+
+    def _invalidate(self):
+        '''Drops the tiles that overlap an edit since the last draw.'''
+        if self._edits is None:
+            self.clear()
+        elif self._edits and self.tiles:
+            keys = list(self.tiles)
+            hit = overlapping(
+                [box for _, box in self.tiles.values()], self._edits
+            )
+            for key, is_hit in zip(keys, hit.tolist()):
+                if is_hit:
+                    self._drop(key)
+        self._edits = []
+
+    def _drop(self, key: Hashable):
+        surface, _ = self.tiles.pop(key)
+        self.bytes -= surface.get_stride() * surface.get_height()
+
+    def draw(
+        self,
+        cr: Context,
+        scene: Scene,
+        method: LineClippingMethod,
+        vp_matrix: np.ndarray,
+        region: Rect,
+    ):
+        '''Draws `region` like `draw_region`, from cached tiles.'''
+        if scene is not self.scene:
+            if self.scene is not None:
+                self.scene.on_edit = None
+            self.scene = scene
+            scene.on_edit = self._edited
+            self.clear()
+        self._invalidate()
+
+        matrix = ndc_matrix(scene.window) @ vp_matrix
+        linear = tuple(
+            float(f'{value:.10g}') for value in matrix[:2, :2].ravel().tolist()
+        )
+        # Frame pixels are the tile plane, offset by a whole number of
+        # pixels, plus the sub-pixel phase that tiles are rendered with.
+        tx, ty = np.round(matrix[2, :2], 3).tolist()
+        ox, oy = floor(tx), floor(ty)
+        level = (linear, round(tx - ox, 3), round(ty - oy, 3), method)
+
+        size = self.TILE_SIZE
+        (x0, y0, _), (x1, y1, _) = region.vertices.tolist()
+        cr.save()
+        cr.rectangle(x0, y0, x1 - x0, y1 - y0)
+        cr.clip()
+        cr.set_operator(cairo.OPERATOR_SOURCE)
+        for i in range(floor((x0 - ox) / size), floor((x1 - ox) / size) + 1):
+            for j in range(
+                floor((y0 - oy) / size),
+                floor((y1 - oy) / size) + 1,
+            ):
+                x, y = ox + i * size, oy + j * size
+                surface = self._tile(
+                    (level, i, j),
+                    scene,
+                    method,
+                    vp_matrix,
+                    Rect(Vec2(x, y), Vec2(x + size, y + size)),
+                )
+                cr.set_source_surface(surface, x, y)
+                cr.rectangle(x, y, size, size)
+                cr.fill()
+        cr.restore()
+
+    def _tile(
+        self,
+        key: Hashable,
+        scene: Scene,
+        method: LineClippingMethod,
+        vp_matrix: np.ndarray,
+        rect: Rect,
+    ) -> cairo.ImageSurface:
+        '''The tile at `key`, rendering the frame pixels `rect` if needed.'''
+        tile = self.tiles.get(key)
+        if tile is not None:
+            self.tiles.move_to_end(key)
+            return tile[0]
+
+        size = self.TILE_SIZE
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, size, size)
+        cr = cairo.Context(surface)
+        cr.translate(-rect.min.x, -rect.min.y)
+        draw_region(cr, scene, method, vp_matrix, rect)
+
+        # The clipping margin makes edits just outside the tile matter.
+        assert scene.window is not None
+        box = region_window(scene.window, vp_matrix, padded(rect)).bounds()
+        self.tiles[key] = (surface, tuple(box.ravel().tolist()))
+        self.bytes += surface.get_stride() * size
+        while self.bytes > self.max_bytes and len(self.tiles) > 1:
+            self._drop(next(iter(self.tiles)))
+        return surface
+
+
+class RetainedFrame:
+    '''The last frame of a scene, kept in an image surface and shifted
+    when the window pans.'''
+
+    # Shifts this close to a whole number of pixels are rounded to it.
+    SNAP = 1e-3
+
+    def __init__(self, tiles: Optional[TileCache] = None):
+        self.tiles = tiles
+        self.surface: Optional[cairo.ImageSurface] = None
+        # Previous surface, reused as the target of the next shift.
+        self._spare: Optional[cairo.ImageSurface] = None
+        # What the surface shows, from `_state`, and its world-to-pixel
+        # matrix.
+        self._state: Optional[tuple] = None
+        self._matrix: Optional[np.ndarray] = None
+
+    def paint(
+        self,
+        cr: Context,
+        scene: Scene,
+        viewport: Rect,
+        method: LineClippingMethod,
+    ):
+        '''Paints the frame of `scene` at `viewport` on `cr`, rendering
+        only what changed since the last call.'''
+        width, height = round(viewport.width), round(viewport.height)
+        if width <= 0 or height <= 0 or scene.window is None:
+            return
+
+        vp_matrix = viewport_matrix(Rect(Vec2(0, 0), Vec2(width, height)))
+        matrix = ndc_matrix(scene.window) @ vp_matrix
+        state = (scene, scene.edit_version, method, width, height)
+
+        shift = self._shift(state, matrix)
+        if shift is None:
+            self._render_all(scene, method, vp_matrix, width, height)
+        elif shift != (0, 0):
+            self._scroll(scene, method, vp_matrix, width, height, *shift)
+
+        self._state = state
+        self._matrix = matrix
+
+        cr.save()
+        cr.set_source_surface(self.surface, viewport.min.x, viewport.min.y)
+        cr.paint()
+        cr.restore()
+
+    def invalidate(self):
+        '''Renders the whole frame on the next `paint`.'''
+        self._state = None
+
+    def _shift(
+        self,
+        state: tuple,
+        matrix: np.ndarray,
+    ) -> Optional[Tuple[int, int]]:
+        '''The whole-pixel shift of the frame since the last render, or None
+        if the frame must be rendered whole.'''
+        previous = self._matrix
+        if self._state is None or previous is None:
+            return None
+        if self._state[0] is not state[0] or self._state[1:] != state[1:]:
+            return None
+        # The same linear part, up to rounding, means a pan.
+        if not np.allclose(matrix[:2, :2], previous[:2, :2], rtol=1e-9):
+            return None
+
+        dx, dy = (matrix[2, :2] - previous[2, :2]).tolist()
+        if (
+            abs(dx - round(dx)) > self.SNAP
+            or abs(dy - round(dy)) > self.SNAP
+        ):
+            return None
+        return round(dx), round(dy)
+
+    def _new_surface(self, width: int, height: int) -> cairo.ImageSurface:
+        surface = self._spare
+        if (
+            surface is None
+            or surface.get_width() != width
+            or surface.get_height() != height
+        ):
+            surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+        self._spare = self.surface
+        self.surface = surface
+        return surface
+
+    def _render_all(
+        self,
+        scene: Scene,
+        method: LineClippingMethod,
+        vp_matrix: np.ndarray,
+        width: int,
+        height: int,
+    ):
+        cr = cairo.Context(self._new_surface(width, height))
+        frame = Rect(Vec2(0, 0), Vec2(width, height))
+        if self.tiles is not None:
+            self.tiles.draw(cr, scene, method, vp_matrix, frame)
+            return
+
+        cr.set_operator(cairo.OPERATOR_CLEAR)
+        cr.paint()
+        cr.set_operator(cairo.OPERATOR_OVER)
+        cr.set_line_width(LINE_WIDTH)
+        cr.set_source_rgb(*COLOR)
+        draw_clipped(
+            cr,
+            scene.clip_objects(method, viewport_width=width),
+            vp_matrix,
+        )
+
+    def _scroll(
+        self,
+        scene: Scene,
+        method: LineClippingMethod,
+        vp_matrix: np.ndarray,
+        width: int,
+        height: int,
+        dx: int,
+        dy: int,
+    ):
+        if abs(dx) >= width or abs(dy) >= height:
+            self._render_all(scene, method, vp_matrix, width, height)
+            return
+
+        previous = self.surface
+        cr = cairo.Context(self._new_surface(width, height))
+        cr.set_operator(cairo.OPERATOR_SOURCE)
+        cr.set_source_surface(previous, dx, dy)
+        cr.paint()
+
+        for region in self._exposed(width, height, dx, dy):
+            if self.tiles is not None:
+                self.tiles.draw(cr, scene, method, vp_matrix, region)
+            else:
+                draw_region(cr, scene, method, vp_matrix, region)
+
+    @staticmethod
+    def _exposed(width: int, height: int, dx: int, dy: int) -> List[Rect]:
+        '''Pixels a shift by `(dx, dy)` leaves uncovered, as at most two
+        disjoint strips.'''
+        strips = []
+        x0, x1 = 0, width
+        if dx > 0:
+            strips.append(Rect(Vec2(0, 0), Vec2(dx, height)))
+            x0 = dx
+        elif dx < 0:
+            strips.append(Rect(Vec2(width + dx, 0), Vec2(width, height)))
+            x1 = width + dx
+
+        if dy > 0:
+            strips.append(Rect(Vec2(x0, 0), Vec2(x1, dy)))
+        elif dy < 0:
+            strips.append(Rect(Vec2(x0, height + dy), Vec2(x1, height)))
+        return strips
+
+
+FORMATS = ('png', 'svg', 'pdf')
+MARGIN = 10
+
+
+def draw_frame(
+    cr: Context,
+    scene: Scene,
+    viewport: Rect,
+    method: LineClippingMethod,
+    frame: Optional[RetainedFrame] = None,
+):
+    '''Draws the scene through its window into `viewport`, with the
+    viewport's outline on top, as the main window shows it.
+
+    A retained `frame` re-renders only what it does not already show.
+    Without one, the visible objects are clipped and drawn in full.'''
+    vp_matrix = viewport_matrix(viewport)
+
+    cr.paint()
+    if frame is not None:
+        frame.paint(cr, scene, viewport, method)
+    elif scene.window is not None:
+        cr.save()
+        cr.set_line_width(LINE_WIDTH)
+        cr.set_source_rgb(*COLOR)
+        draw_clipped(
+            cr,
+            scene.clip_objects(method, viewport_width=viewport.width),
+            vp_matrix,
+        )
+        cr.restore()
+
+    cr.set_line_width(2.0)
+    cr.set_source_rgb(0.4, 0.4, 0.4)
+    viewport.draw(cr, vp_matrix)
+
+
+def fit_window(scene: Scene) -> Optional[Window]:
+    '''A window around every object of the scene, or None when it has
+    nothing to show.'''
+    if not scene.objs:
+        return None
+    boxes = np.array([obj.bounds() for obj in scene.objs])
+    low, high = boxes[:, 0].min(axis=0), boxes[:, 1].max(axis=0)
+    # Degenerate scenes, like a single point, still get some area.
+    pad = np.maximum((high - low) * 0.05, 1.0)
+    return Window(Vec2(*(low - pad)), Vec2(*(high + pad)))
+
+
+def render_scene(
+    scene: Scene,
+    path: Path,
+    width: int,
+    height: int,
+    method: LineClippingMethod = LineClippingMethod.COHEN_SUTHERLAND,
+    format: Optional[str] = None,
+):
+    '''Renders the scene through its window to a `width` by `height`
+    image file, as PNG, SVG or PDF.
+
+    The format defaults to the one the file's extension names.'''
+    if format is None:
+        format = Path(path).suffix[1:].lower()
+    if format not in FORMATS:
+        raise ValueError(f'Unsupported image format: {format!r}')
+
+    if format == 'png':
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+    elif format == 'svg':
+        surface = cairo.SVGSurface(str(path), width, height)
+    else:
+        surface = cairo.PDFSurface(str(path), width, height)
+
+    viewport = Rect(Vec2(0, 0), Vec2(width, height)).with_margin(MARGIN)
+    draw_frame(cairo.Context(surface), scene, viewport, method)
+
+    if format == 'png':
+        surface.write_to_png(str(path))
+    surface.finish()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Renders scene files to PNG, SVG or PDF images.'
+    )
+    parser.add_argument('scenes', nargs='+', metavar='scene')
+    parser.add_argument(
+        '-o', '--output', required=True,
+        help='image file for a single scene, or directory for several',
+    )
+    parser.add_argument(
+        '-f', '--format', choices=FORMATS,
+        help="defaults to the output's extension, or png for directories",
+    )
+    parser.add_argument(
+        '--size', nargs=2, type=int, default=(800, 600),
+        metavar=('WIDTH', 'HEIGHT'),
+    )
+    parser.add_argument(
+        '--window', nargs=4, type=float,
+        metavar=('XMIN', 'YMIN', 'XMAX', 'YMAX'),
+        help="defaults to the scene's own, or one around all of it",
+    )
+    parser.add_argument(
+        '--angle', type=float,
+        help='window rotation, in degrees',
+    )
+    parser.add_argument(
+        '--clipping', default='cohen-sutherland',
+        choices=[
+            m.name.lower().replace('_', '-') for m in LineClippingMethod
+        ],
+    )
+    args = parser.parse_args()
+
+    method = LineClippingMethod[args.clipping.upper().replace('-', '_')]
+    output = Path(args.output)
+    batch = len(args.scenes) > 1 or output.is_dir()
+    if batch:
+        output.mkdir(parents=True, exist_ok=True)
+    format = args.format or (
+        'png' if batch else output.suffix[1:].lower() or 'png'
+    )
+
+    failed = 0
+    for source in args.scenes:
+        # Dropped before loading the next, which may need the memory.
+        scene = None
+        target = (
+            output / Path(source).with_suffix('.' + format).name
+            if batch else output
+        )
+        try:
+            scene = load_scene(source)
+            if args.window is not None:
+                xmin, ymin, xmax, ymax = args.window
+                scene.window = Window(Vec2(xmin, ymin), Vec2(xmax, ymax))
+            elif scene.window is None:
+                scene.window = fit_window(scene)
+            if args.angle is not None and scene.window is not None:
+                scene.window.angle = args.angle
+                scene.rotate_window()
+            render_scene(scene, target, *args.size, method, format)
+        except (OSError, ValueError, cairo.Error, MemoryError) as e:
+            # One bad file should not stop a batch of thousands.
+            print(f'{source}: {str(e) or type(e).__name__}', file=sys.stderr)
+            failed += 1
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,40 +1,505 @@
-from typing import List, Optional, Reversible
+from contextlib import contextmanager
+from typing import (
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Reversible,
+    Set,
+    Tuple,
+    cast,
+)
 
+import numpy as np
 
 from linalg import Vec2
-from graphics import GraphicObject, Window
+from clipping import classify_bounds, clip_lines, LineClippingMethod
+from graphics import ClippedGeometry, Curve, GraphicObject, Line, Window
+from spatial import Box, UniformGrid
+from transformations import ndc_matrix
+from vertexstore import VertexStore
 
 
 class Scene:
-    def __init__(self, objs: List[GraphicObject] = [], window: Window = None):
-        self.objs = objs
-        self.window: Optional[Window] = window
+    '''Objects plus the window they are viewed through.'''
+
+    # Screen-space flatness of curve tessellations, in pixels.
+    CURVE_TOLERANCE = 0.5
+
+    def __init__(
+        self,
+        objs: Optional[List[GraphicObject]] = None,
+        window: Optional[Window] = None,
+        store: Optional[VertexStore] = None,
+    ):
+        self.objs: List[GraphicObject] = []
+        # Shared by every 2D object; objects already in it are not copied.
+        self.store = store if store is not None else VertexStore()
+        # Parametric curves, whose tessellations change length with the
+        # zoom. Kept apart so that re-tessellating never grows `store`,
+        # which may map a file.
+        self.curve_store = VertexStore(dim=self.store.dim)
+        # Objects added to a store that maps a file, such as a loaded
+        # .cgscene, go here instead: growing the mapping would copy all of
+        # it into memory.
+        if isinstance(self.store.world, np.memmap):
+            self.added_store = VertexStore(dim=self.store.dim)
+        else:
+            self.added_store = self.store
+        # Objects of another dimensionality (3D), never culled.
+        self.unstored: List[GraphicObject] = []
+        # World bounding boxes of the stored objects, for view culling.
+        self.index = UniformGrid()
+        # Drawing order of each object, since index queries are unordered.
+        self._order: Dict[GraphicObject, int] = {}
+        self._next_order = 0
+
+        # Bumped whenever the window changes.
+        self.window_version = 0
+        # Versions of temporary windows count down from -2, so that the
+        # scene's own versions and the -1 of `_store_ndc_version` never
+        # reach them.
+        self._view_version = -1
+        # Bumped whenever an object is added, removed or edited.
+        # Re-tessellating a curve for the zoom is not an edit.
+        self.edit_version = 0
+        # Called with the world box of each area an edit changed, or None
+        # when it is unknown, e.g. for objects that are not indexed.
+        self.on_edit: Optional[Callable[[Optional[Box]], None]] = None
+        self._tessellating = False
+        self._ndc_version: Dict[GraphicObject, int] = {}
+        self._store_ndc_version = -1
+        # Number of times the whole store has been projected.
+        self._store_projections = 0
+        self._dirty: Set[GraphicObject] = set()
+        # Stored objects that may hold a pending model transform.
+        self._modeled: Set[GraphicObject] = set()
+        # Curves that may be re-tessellated for the current zoom.
+        self._curves: Set[Curve] = set()
+        # Last clipping result of each object, valid while its NDC is.
+        self._clip_cache: Dict[
+            GraphicObject,
+            Tuple[LineClippingMethod, Optional[ClippedGeometry]]
+        ] = {}
+        # Objects whose NDC was computed for a temporary window.
+        self._borrowed: Optional[Set[GraphicObject]] = None
+
+        self._window: Optional[Window] = window
+
+        for obj in objs or []:
+            self.add_object(obj)
+
+    @property
+    def window(self) -> Optional[Window]:
+        return self._window
+
+    @window.setter
+    def window(self, window: Optional[Window]):
+        self._window = window
+        self.window_changed()
+
+    def window_changed(self):
+        '''Marks the NDC coordinates of every object as stale. Call after
+        modifying the window in place.'''
+        if self.window_version < 0:
+            self._view_version -= 1
+            self.window_version = self._view_version
+        else:
+            self.window_version += 1
+        self._clip_cache.clear()
+
+    @contextmanager
+    def viewed_through(self, window: Window) -> Iterator['Scene']:
+        '''Temporarily views the scene through another window, keeping
+        what was computed for the scene's own window where it can.'''
+        saved = self._window, self.window_version, self._clip_cache
+        saved_borrowed = self._borrowed
+        projections = self._store_projections
+        buffers = [store.world for store in self._stores()]
+        borrowed: Set[GraphicObject] = set()
+        self._window = window
+        self._view_version -= 1
+        self.window_version = self._view_version
+        self._clip_cache = {}
+        self._borrowed = borrowed
+        try:
+            yield self
+        finally:
+            self._window, self.window_version, self._clip_cache = saved
+            self._borrowed = saved_borrowed
+            if saved_borrowed is not None:
+                saved_borrowed |= borrowed
+            # Their NDC is for the other window, which the fast path of
+            # `_stale` does not look at the versions of.
+            self._dirty |= borrowed
+            if (
+                self._store_projections != projections
+                or any(
+                    store.world is not buffer
+                    for store, buffer in zip(self._stores(), buffers)
+                )
+            ):
+                # The whole store was projected for the other window, or
+                # moved, so nothing cached is left.
+                self._store_ndc_version = -1
+                self.window_changed()
+            else:
+                # Cached clips are views into the NDC rows of the objects.
+                for obj in self._dirty:
+                    self._clip_cache.pop(obj, None)
 
     def add_object(self, obj: GraphicObject):
-        if self.window is not None:
-            obj.update_ndc(self.window)
+        self.edit_version += 1
+        store = self._store_for(obj)
+        buffer = store.world
+        self._adopt(obj)
+        if store.world is not buffer:
+            # Cached results may hold views into the old buffer.
+            self._clip_cache.clear()
         self.objs.append(obj)
 
+        self._order[obj] = self._next_order
+        self._next_order += 1
+        self._dirty.add(obj)
+        obj.on_change = self._object_changed
+        if isinstance(obj, Curve):
+            self._curves.add(obj)
+        if self._owns(obj):
+            self.index.insert(obj, obj.bounds())
+            if obj._model is not None:
+                self._modeled.add(obj)
+        self._edited(obj)
+
     def remove_objects(self, indexes: Reversible[int]):
+        self.edit_version += 1
         for i in reversed(indexes):
-            self.objs.pop(i)
+            obj = self.objs.pop(i)
+            self._edited(obj)
+            obj.on_change = None
+            del self._order[obj]
+            self._ndc_version.pop(obj, None)
+            self._dirty.discard(obj)
+            self._modeled.discard(obj)
+            self._curves.discard(obj)
+            self._clip_cache.pop(obj, None)
+
+            if self._owns(obj):
+                self.index.remove(obj)
+                obj._store.release(obj._offset, obj._length)
+                obj.detach()
+            else:
+                self.unstored.remove(obj)
+
+        for store in self._stores():
+            self._compact_if_sparse(store)
+
+    def _stores(self) -> List[VertexStore]:
+        '''The scene's distinct stores.'''
+        stores = [self.store, self.curve_store]
+        if self.added_store is not self.store:
+            stores.append(self.added_store)
+        return stores
+
+    def _store_for(self, obj: GraphicObject) -> VertexStore:
+        '''The scene's store for the object's vertices.'''
+        if self._owns(obj):
+            return obj._store
+        if isinstance(obj, Curve) and obj.control_points is not None:
+            return self.curve_store
+        return self.added_store
+
+    def _owns(self, obj: GraphicObject) -> bool:
+        '''Whether the object's vertices are in one of the scene's stores.'''
+        return (
+            obj._store is self.store
+            or obj._store is self.curve_store
+            or obj._store is self.added_store
+        )
+
+    def _adopt(self, obj: GraphicObject):
+        '''Moves the object's vertices into the scene's store.'''
+        if self._owns(obj):
+            return
+        if obj._store.dim != self.store.dim:
+            self.unstored.append(obj)
+            return
+        store = self._store_for(obj)
+        obj.bind(store, store.allocate(obj._length))
+
+    def _object_changed(self, obj: GraphicObject):
+        self._dirty.add(obj)
+        self._clip_cache.pop(obj, None)
+        old = self.index.bounds.get(obj)
+        if obj in self.index:
+            self.index.update(obj, obj.bounds())
+            if obj._model is not None:
+                self._modeled.add(obj)
+        if not self._tessellating:
+            self.edit_version += 1
+            if self.on_edit is not None:
+                # An edit can move the object, so the area it covered
+                # needs redrawing as well as the one it covers now.
+                self.on_edit(old)
+                self.on_edit(self.index.bounds.get(obj))
+
+    def _edited(self, obj: GraphicObject):
+        '''Reports the indexed box of `obj` to `on_edit`.'''
+        if self.on_edit is not None:
+            self.on_edit(self.index.bounds.get(obj))
+
+    def _compact_if_sparse(self, store: VertexStore):
+        if store.freed > store.used // 2:
+            self._compact(store)
+
+    def _compact(self, old: VertexStore):
+        '''Repacks one of the scene's stores, dropping the holes left by
+        removed objects.'''
+        new = VertexStore(dim=old.dim, capacity=old.used - old.freed)
+        if old is self.store:
+            self.store = new
+        if old is self.added_store:
+            self.added_store = new
+        if old is self.curve_store:
+            self.curve_store = new
+        for obj in self.objs:
+            if obj._store is old:
+                obj.bind(new, new.allocate(obj._length))
+        self._clip_cache.clear()
 
     def translate_window(self, offset: Vec2):
         if self.window is not None:
             self.window.translate(offset)
-        self.update_ndc()
+        self.window_changed()
 
     def zoom_window(self, factor: float):
         if self.window is not None:
             self.window.scale(Vec2(factor, factor))
-        self.update_ndc()
+        self.window_changed()
 
     def rotate_window(self):
-        self.update_ndc()
+        self.window_changed()
 
-    def update_ndc(self):
+    def bake(self):
+        '''Applies every object's pending model transform to its vertices.'''
         for obj in self.objs:
-            obj.update_ndc(self.window)
+            obj.bake()
+        self._modeled.clear()
+
+    def _in_view(self) -> List[GraphicObject]:
+        assert self.window is not None
+        indexed = self.index.query(self.window.bounds())
+        return cast(List[GraphicObject], indexed) + self.unstored
+
+    def visible_objects(self) -> List[GraphicObject]:
+        '''Objects whose world bounding box intersects the window's, in
+        drawing order.'''
+        if self.window is None:
+            return list(self.objs)
+
+        visible = self._in_view()
+        visible.sort(key=self._order.__getitem__)
+        return visible
+
+    def _stale(self, in_view: List[GraphicObject]) -> List[GraphicObject]:
+        '''Objects whose NDC must be recomputed before `in_view` is drawn.'''
+        version = self.window_version
+        if self._store_ndc_version == version:
+            # The window has not moved since the whole store was updated,
+            # so only objects edited since then can be stale.
+            return list(self._dirty) + [
+                obj for obj in self.unstored
+                if self._ndc_version.get(obj) != version
+                and obj not in self._dirty
+            ]
+
+        return [
+            obj for obj in in_view
+            if obj in self._dirty or self._ndc_version.get(obj) != version
+        ]
+
+    def update_ndc(self):
+        '''Brings the NDC coordinates of the objects in view up to date.'''
+        if self.window is not None:
+            self._update_ndc(self._in_view())
+
+    def _update_ndc(self, in_view: List[GraphicObject]):
+        window = self.window
+        assert window is not None
+        stale = self._stale(in_view)
+        if not stale:
+            return
+
+        t_matrix = ndc_matrix(window)
+        stored = [obj for obj in stale if obj._store is self.store]
+
+        if 2 * len(stored) > len(self.index):
+            used = self.store.used
+            np.matmul(
+                self.store.world[:used],
+                t_matrix,
+                out=self.store.ndc[:used]
+            )
+            self._modeled = {
+                obj for obj in self._modeled if obj._model is not None
+            }
+            for obj in self._modeled:
+                obj.update_ndc(window)
+            self._store_ndc_version = self.window_version
+            self._store_projections += 1
+            # Edited objects out of view are up to date as well.
+            for obj in self._dirty:
+                if obj._store is self.store:
+                    self._ndc_version[obj] = self.window_version
+            self._dirty = {
+                obj for obj in self._dirty if obj._store is not self.store
+            }
+        else:
+            self._project_rows(self.store, stored, window, t_matrix)
+        if self.added_store is not self.store:
+            self._project_rows(
+                self.added_store,
+                [obj for obj in stale if obj._store is self.added_store],
+                window,
+                t_matrix,
+            )
+
+        for obj in stale:
+            if (
+                obj._store is not self.store
+                and obj._store is not self.added_store
+            ):
+                obj.update_ndc(window)
+            self._ndc_version[obj] = self.window_version
+            self._dirty.discard(obj)
+        if self._borrowed is not None:
+            self._borrowed.update(stale)
+
+    @staticmethod
+    def _project_rows(
+        store: VertexStore,
+        objs: List[GraphicObject],
+        window: Window,
+        t_matrix: np.ndarray,
+    ):
+        '''Updates the NDC of `objs`, all in `store`, with one product.'''
+        plain = [obj for obj in objs if obj._model is None]
+        if plain:
+            rows = np.concatenate([
+                np.arange(obj._offset, obj._offset + obj._length)
+                for obj in plain
+            ])
+            store.ndc[rows] = store.world[rows] @ t_matrix
+        for obj in objs:
+            if obj._model is not None:
+                obj.update_ndc(window)
+
+    def tessellate_curves(
+        self,
+        in_view: List[GraphicObject],
+        viewport_width: Optional[float] = None,
+    ) -> bool:
+        '''Re-tessellates the parametric curves among `in_view` for the
+        zoom. Returns whether any curve changed.'''
+        if not self._curves:
+            return False
+
+        self._tessellating = True
+        try:
+            changed = self._tessellate(in_view, viewport_width)
+        finally:
+            self._tessellating = False
+
+        if changed:
+            # Tessellations of another length leave holes in the store.
+            self._compact_if_sparse(self.curve_store)
+        return changed
+
+    def _tessellate(
+        self,
+        in_view: List[GraphicObject],
+        viewport_width: Optional[float],
+    ) -> bool:
+        changed = False
+        if viewport_width:
+            assert self.window is not None
+            tolerance = (
+                self.CURVE_TOLERANCE * self.window.width / viewport_width
+            )
+            for obj in in_view:
+                if obj in self._curves:
+                    changed |= obj.tessellate(tolerance)
+        else:
+            for obj in in_view:
+                if obj in self._curves:
+                    changed |= obj.ensure_tessellated()
+        return changed
+
+    def clip_objects(
+        self,
+        method: LineClippingMethod = LineClippingMethod.COHEN_SUTHERLAND,
+        viewport_width: Optional[float] = None,
+    ) -> List[ClippedGeometry]:
+        '''Returns the visible part of every object in view, in drawing
+        order.'''
+        if self.window is None:
+            return []
+
+        objs = self._in_view()
+        # Curve bounds come from the control points, so tessellating does
+        # not change what is in view.
+        self.tessellate_curves(objs, viewport_width)
+        self._update_ndc(objs)
+        objs.sort(key=self._order.__getitem__)
+
+        clipped: List[Optional[ClippedGeometry]] = [None] * len(objs)
+        pending = []
+        for i, obj in enumerate(objs):
+            cached = self._clip_cache.get(obj)
+            if cached is not None and cached[0] is method:
+                clipped[i] = cached[1]
+            else:
+                pending.append(i)
+
+        if pending:
+            self._clip(objs, pending, clipped, method)
+            for i in pending:
+                self._clip_cache[objs[i]] = (method, clipped[i])
+
+        return [obj for obj in clipped if obj is not None]
+
+    def _clip(
+        self,
+        objs: List[GraphicObject],
+        pending: List[int],
+        clipped: List[Optional[ClippedGeometry]],
+        method: LineClippingMethod,
+    ):
+        '''Clips `objs[i]` into `clipped[i]` for every index in `pending`.'''
+        # NaN boxes are neither inside nor outside.
+        unknown = np.full((2, 2), np.nan)
+        inside, outside = classify_bounds(
+            np.stack([
+                objs[i].bounds() if self._owns(objs[i]) else unknown
+                for i in pending
+            ]),
+            ndc_matrix(self.window),
+        )
+
+        lines: List[Tuple[int, Line]] = []
+        for i, is_inside, is_outside in zip(pending, inside, outside):
+            obj = objs[i]
+            if is_inside:
+                clipped[i] = ClippedGeometry(obj, obj.vertices_ndc)
+            elif is_outside:
+                continue
+            elif type(obj) is Line:
+                lines.append((i, obj))
+            else:
+                clipped[i] = obj.clipped(method=method)
 
-    def clip_objects(self):
-        pass
+        for (i, _), line in zip(
+            lines,
+            clip_lines([obj for _, obj in lines], method)
+        ):
+            clipped[i] = line
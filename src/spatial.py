@@ -0,0 +1,133 @@
+'''Spatial indexing of world-space bounding boxes.'''
+from collections import defaultdict
+from math import floor
+from typing import Dict, Hashable, Iterator, List, Sequence, Set, Tuple
+
+import numpy as np
+
+Bounds = np.ndarray  # [[xmin, ymin], [xmax, ymax]]
+Box = Tuple[float, float, float, float]  # xmin, ymin, xmax, ymax
+CellRange = Tuple[int, int, int, int]
+
+
+def overlaps(a: Box, b: Box) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def overlapping(
+    boxes: Sequence[Box],
+    others: Sequence[Box],
+    chunk_size: int = 4096,
+) -> np.ndarray:
+    '''Whether each of `boxes` overlaps any of `others`, comparing them
+    `chunk_size` of `others` at a time to bound the memory used.'''
+    hit = np.zeros(len(boxes), dtype=bool)
+    if not len(boxes):
+        return hit
+
+    a = np.array(boxes, dtype=float)[:, np.newaxis]
+    for start in range(0, len(others), chunk_size):
+        b = np.array(others[start:start + chunk_size], dtype=float)
+        hit |= (
+            (a[..., 0] <= b[:, 2])
+            & (b[:, 0] <= a[..., 2])
+            & (a[..., 1] <= b[:, 3])
+            & (b[:, 1] <= a[..., 3])
+        ).any(axis=1)
+    return hit
+
+
+class UniformGrid:
+    '''Uniform grid of square cells, each listing the items whose bounding
+    box touches it.
+
+    Items spanning more than `max_cells` cells are kept in a separate list
+    that every query scans, so a few huge objects do not flood the grid.'''
+
+    def __init__(self, cell_size: float = 100.0, max_cells: int = 64):
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        self.cells: Dict[Tuple[int, int], Set[Hashable]] = defaultdict(set)
+        self.large: Set[Hashable] = set()
+        # Items without a finite box yet, placed once `update` gives one.
+        self.empty: Set[Hashable] = set()
+        # Boxes as plain floats, which compare much faster than arrays.
+        self.bounds: Dict[Hashable, Box] = {}
+        self._ranges: Dict[Hashable, CellRange] = {}
+
+    def __len__(self) -> int:
+        return len(self.bounds)
+
+    def __contains__(self, item: Hashable) -> bool:
+        return item in self.bounds or item in self.empty
+
+    def _cell_range(self, bounds: Bounds) -> CellRange:
+        (xmin, ymin), (xmax, ymax) = bounds / self.cell_size
+        return floor(xmin), floor(ymin), floor(xmax), floor(ymax)
+
+    @staticmethod
+    def _range_size(cell_range: CellRange) -> int:
+        i0, j0, i1, j1 = cell_range
+        return (i1 - i0 + 1) * (j1 - j0 + 1)
+
+    @staticmethod
+    def _cells_in(cell_range: CellRange) -> Iterator[Tuple[int, int]]:
+        i0, j0, i1, j1 = cell_range
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                yield i, j
+
+    def insert(self, item: Hashable, bounds: Bounds):
+        if not np.isfinite(bounds).all():
+            self.empty.add(item)
+            return
+
+        cell_range = self._cell_range(bounds)
+        self.bounds[item] = tuple(bounds.ravel().tolist())
+        self._ranges[item] = cell_range
+
+        if self._range_size(cell_range) > self.max_cells:
+            self.large.add(item)
+        else:
+            for cell in self._cells_in(cell_range):
+                self.cells[cell].add(item)
+
+    def remove(self, item: Hashable):
+        if item not in self.bounds:
+            self.empty.discard(item)
+            return
+
+        del self.bounds[item]
+        cell_range = self._ranges.pop(item)
+
+        if item in self.large:
+            self.large.discard(item)
+            return
+
+        for cell in self._cells_in(cell_range):
+            items = self.cells[cell]
+            items.discard(item)
+            if not items:
+                del self.cells[cell]
+
+    def update(self, item: Hashable, bounds: Bounds):
+        self.remove(item)
+        self.insert(item, bounds)
+
+    def query(self, bounds: Bounds) -> List[Hashable]:
+        '''Returns every item whose bounding box overlaps `bounds`.'''
+        cell_range = self._cell_range(bounds)
+
+        if self._range_size(cell_range) >= len(self.bounds):
+            # Cheaper to test every item than to walk that many cells.
+            candidates: Set[Hashable] = set(self.bounds)
+        else:
+            candidates = set(self.large)
+            for cell in self._cells_in(cell_range):
+                candidates |= self.cells.get(cell, set())
+
+        box = tuple(bounds.ravel().tolist())
+        return [
+            item for item in candidates
+            if overlaps(self.bounds[item], box)
+        ]
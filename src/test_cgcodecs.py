@@ -0,0 +1,306 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from cgcodecs import load_scene, ObjCodec, read_scene_batches, save_scene
+from graphics import Curve, Line, Point, Polygon, Vec2, Window
+from scene import Scene
+from transformations import ndc_matrix
+
+CURVE = '''v 0.0 0.0 1.0
+v 1.0 2.0 1.0
+v 2.0 2.0 1.0
+v 3.0 0.0 1.0
+v 4.0 1.0 1.0
+cstype {cstype}
+deg 3
+curv {range} 1 2 3 4 5
+parm u {knots}
+end
+'''
+
+
+class ObjCurveTest(unittest.TestCase):
+    def curve(self, cstype='bspline', range='3.0 5.0',
+              knots='0 1 2 3 4 5 6 7 8'):
+        text = CURVE.format(cstype=cstype, range=range, knots=knots)
+        return ObjCodec.decode(text).objs[0]
+
+    def test_round_trip(self):
+        points = [Vec2(0, 0), Vec2(1, 2), Vec2(2, 2), Vec2(3, 0)]
+        for type in ('bezier', 'b-spline'):
+            curve = Curve.from_control_points(points, type=type)
+            decoded = ObjCodec.decode(ObjCodec.encode(Scene([curve])))
+            read = decoded.objs[0]
+            self.assertEqual(read.curve_type, type)
+            np.testing.assert_allclose(
+                read.control_points, curve.control_points
+            )
+
+    def test_uniform_bspline(self):
+        self.assertEqual(self.curve().curve_type, 'b-spline')
+
+    def test_rational(self):
+        with self.assertRaises(ValueError):
+            self.curve(cstype='rat bspline')
+
+    def test_clamped_knots(self):
+        with self.assertRaises(ValueError):
+            self.curve(range='0.0 1.0', knots='0 0 0 0 1 1 1 1 1')
+
+    def test_malformed_knots(self):
+        with self.assertRaises(ValueError):
+            self.curve(knots='0 1 2 3 4 5 6 7 x')
+
+    def test_partial_range(self):
+        with self.assertRaises(ValueError):
+            self.curve(range='3.0 4.0')
+
+
+class ObjVertexTest(unittest.TestCase):
+    def test_mixed_arities(self):
+        scene = ObjCodec.decode('v 1 2 3 4\nv 5 6\nl 1 2\n')
+        np.testing.assert_allclose(
+            scene.objs[0].vertices[:, :2], [[1, 2], [5, 6]]
+        )
+
+    def test_crlf(self):
+        text = 'v 1 2 1\r\nv 3 4 1\r\no edge\r\nl 1 2\r\n'
+        line = ObjCodec.decode(text).objs[0]
+        self.assertEqual(line.name, 'edge')
+        np.testing.assert_allclose(line.vertices[:, :2], [[1, 2], [3, 4]])
+
+    def test_trailing_comment(self):
+        text = 'v 1 2 # first\nv 3 4 1#second\r\nv 5 6\nl 1 2 3\n'
+        np.testing.assert_allclose(
+            ObjCodec.decode(text).objs[0].vertices[:, :2],
+            [[1, 2], [3, 4], [5, 6]],
+        )
+        with self.assertRaisesRegex(ValueError, 'v 5 x'):
+            ObjCodec.decode('v 1 2 # first\nv 5 x\nl 1 2\n')
+
+    def test_malformed_vertex(self):
+        for text in ('v 1\nl 1 1\n', 'v 1 x 3\nl 1 1\n'):
+            with self.assertRaises(ValueError):
+                ObjCodec.decode(text)
+
+    def test_malformed_indexes(self):
+        for line in ('l 1 2 x', 'p 1x', 'w 1 2.5'):
+            with self.assertRaises(ValueError):
+                ObjCodec.decode(f'v 1 2 1\nv 3 4 1\n{line}\n')
+
+    def test_index_out_of_range(self):
+        for refs in ('1 3', '0 1', '1 -3'):
+            with self.assertRaises(ValueError):
+                ObjCodec.decode(f'v 1 2 1\nv 3 4 1\nl {refs}\n')
+
+    def test_malformed_line(self):
+        for line in ('l 1 99999', 'usemtl', 'deg', 'cstype', 'w 1'):
+            with self.assertRaises(ValueError):
+                ObjCodec.decode(f'v 1 2 1\nv 3 4 1\n{line}\n')
+
+
+class ObjWriteTest(unittest.TestCase):
+    '''Output written in chunks smaller than the scene.'''
+
+    def setUp(self):
+        self.scene = Scene(
+            [
+                Polygon([Vec2(i, 0), Vec2(i + 1, 0), Vec2(i + .5, 1.5)])
+                for i in range(10)
+            ]
+            + [Line(Vec2(0, 0), Vec2(9, 9)), Point(Vec2(0.1, 0.2))],
+            Window(Vec2(-1, -1), Vec2(11, 11)),
+        )
+
+    def test_same_as_unchunked(self):
+        text = ObjCodec.encode(self.scene)
+        with mock.patch.object(ObjCodec, 'CHUNK_ROWS', 4):
+            self.assertEqual(ObjCodec.encode(self.scene), text)
+
+        read = ObjCodec.decode(text)
+        self.assertEqual(len(read.objs), len(self.scene.objs))
+        for obj, expected in zip(read.objs, self.scene.objs):
+            np.testing.assert_allclose(obj.vertices, expected.vertices)
+
+    def test_progress(self):
+        fractions = []
+        with mock.patch.object(ObjCodec, 'CHUNK_ROWS', 4):
+            with tempfile.TemporaryFile('w+') as file:
+                ObjCodec.write(self.scene, file, fractions.append)
+        self.assertGreater(len(fractions), 2)
+        self.assertEqual(fractions, sorted(fractions))
+        self.assertEqual(fractions[-1], 1.0)
+
+
+class BinaryCodecTest(unittest.TestCase):
+    def test_round_trip(self):
+        points = [Vec2(0, 0), Vec2(1, 2), Vec2(2, 2), Vec2(3, 0)]
+        scene = Scene(
+            [
+                Point(Vec2(1, 1), name='p'),
+                Line(Vec2(0, 0), Vec2(1, 2)),
+                Polygon(points, filled=True),
+                Curve.from_control_points(points, type='b-spline'),
+            ],
+            Window(Vec2(-1, -1), Vec2(4, 4)),
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'scene.cgscene')
+            save_scene(scene, path)
+            read = load_scene(path)
+
+            self.assertEqual(
+                [type(obj) for obj in read.objs],
+                [type(obj) for obj in scene.objs],
+            )
+            self.assertEqual(read.objs[0].name, 'p')
+            self.assertTrue(read.objs[2].filled)
+            for obj, expected in zip(read.objs[:3], scene.objs):
+                np.testing.assert_allclose(obj.vertices, expected.vertices)
+            np.testing.assert_allclose(
+                read.objs[3].control_points, scene.objs[3].control_points
+            )
+            del read
+
+    def test_curves_keep_store_mapped(self):
+        points = [Vec2(0, 0), Vec2(1, 2), Vec2(2, 2), Vec2(3, 0)]
+        scene = Scene(
+            [
+                Line(Vec2(0, 0), Vec2(1, 2)),
+                Curve.from_control_points(points, type='bezier'),
+            ],
+            Window(Vec2(-1, -1), Vec2(4, 4)),
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'scene.cgscene')
+            save_scene(scene, path)
+            read = load_scene(path)
+
+            read.clip_objects(viewport_width=800)
+            read.zoom_window(0.5)
+            read.clip_objects(viewport_width=800)
+
+            self.assertIsInstance(read.store.world, np.memmap)
+            self.assertGreater(len(read.objs[1].vertices), len(points))
+            del read
+
+    def test_added_objects_keep_store_mapped(self):
+        scene = Scene(
+            [Line(Vec2(0, 0), Vec2(1, 2))], Window(Vec2(-1, -1), Vec2(4, 4))
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'scene.cgscene')
+            save_scene(scene, path)
+            read = load_scene(path)
+            world, used = read.store.world, read.store.used
+
+            added = [
+                Polygon([Vec2(i, 0), Vec2(i + 1, 0), Vec2(i, 1)])
+                for i in range(100)
+            ]
+            for obj in added:
+                read.add_object(obj)
+            self.assertIs(read.store.world, world)
+            self.assertEqual(read.store.used, used)
+            self.assertIs(added[0]._store, read.added_store)
+
+            clipped = {c.source: c for c in read.clip_objects()}
+            window = ndc_matrix(read.window)
+            for obj in [read.objs[0]] + added[:4]:
+                np.testing.assert_allclose(
+                    obj.vertices_ndc, obj.vertices @ window
+                )
+                self.assertIn(obj, clipped)
+
+            read.remove_objects(range(1, 80))
+            self.assertIs(read.store.world, world)
+            np.testing.assert_allclose(
+                added[-1].vertices, [[99, 0, 1], [100, 0, 1], [99, 1, 1]]
+            )
+            del read, world
+
+
+class Cancelled(Exception):
+    pass
+
+
+class SceneBatchesTest(unittest.TestCase):
+    '''The reading half of the background loader.'''
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.scene = Scene(
+            [
+                Line(Vec2(i, 0), Vec2(i, 1), name=f'line{i}')
+                for i in range(50)
+            ]
+            + [Curve.from_control_points(
+                [Vec2(0, 0), Vec2(1, 2), Vec2(2, 2), Vec2(3, 0)]
+            )],
+            Window(Vec2(-1, -1), Vec2(4, 4)),
+        )
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def save(self, extension):
+        path = os.path.join(self.directory.name, 'scene' + extension)
+        save_scene(self.scene, path)
+        return path
+
+    def check_batches(self, path):
+        fractions = []
+        batches = list(read_scene_batches(path, 8, fractions.append))
+
+        self.assertTrue(all(len(objs) <= 8 for _, objs, _ in batches))
+        objs = [obj for _, batch, _ in batches for obj in batch]
+        self.assertEqual(
+            [obj.name for obj in objs],
+            [obj.name for obj in load_scene(path).objs],
+        )
+        self.assertEqual(fractions, sorted(fractions))
+        self.assertEqual(fractions[-1], 1.0)
+
+        window = batches[-1][0]
+        self.assertIsNotNone(window)
+        np.testing.assert_allclose(window.min, self.scene.window.min)
+        return batches
+
+    def test_obj(self):
+        for _, _, store in self.check_batches(self.save('.obj')):
+            self.assertIsNone(store)
+
+    def test_binary(self):
+        batches = self.check_batches(self.save('.cgscene'))
+        stores = {id(store) for _, _, store in batches}
+        self.assertEqual(len(stores), 1)
+
+        # Like the main window, build the scene on the mapped store.
+        store = batches[0][2]
+        scene = Scene(window=batches[-1][0], store=store)
+        for _, objs, _ in batches:
+            for obj in objs:
+                scene.add_object(obj)
+        self.assertIs(scene.store, store)
+        # Lines 0 to 4 and the curve are in view.
+        self.assertEqual(len(scene.clip_objects(viewport_width=100)), 6)
+        del batches, scene, store
+
+    def test_cancel_from_progress(self):
+        def cancel(fraction):
+            raise Cancelled()
+
+        for extension in ('.obj', '.cgscene'):
+            with self.assertRaises(Cancelled):
+                for _ in read_scene_batches(
+                    self.save(extension), 8, cancel
+                ):
+                    pass
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import unittest
+
+import numpy as np
+
+from clipping import (
+    classify_bounds,
+    cohen_sutherland_clip_segments,
+    cohen_sutherland_line_clip,
+    curve_clip,
+    liang_barsky_clip_segments,
+    liang_barsky_line_clip,
+    poly_clip,
+)
+from graphics import Curve, Line, Polygon, Window
+from linalg import Vec2
+from transformations import ndc_matrix
+
+
+class CurveClipTest(unittest.TestCase):
+    def clip(self, *points):
+        curve = Curve([Vec2(x, y) for x, y in points])
+        curve.update_ndc(Window(Vec2(-1, -1), Vec2(1, 1)))
+        return curve_clip(curve)
+
+    def test_inside(self):
+        clipped = self.clip((-0.5, 0), (0, 0), (0.5, 0.5))
+        np.testing.assert_allclose(
+            clipped.vertices_ndc[:, :2], [[-0.5, 0], [0, 0], [0.5, 0.5]]
+        )
+
+    def test_clipped_at_one_end(self):
+        clipped = self.clip((-2, 0), (0, 0), (0.5, 0.5))
+        np.testing.assert_allclose(
+            clipped.vertices_ndc[:, :2], [[-1, 0], [0, 0], [0.5, 0.5]]
+        )
+
+    def test_split_into_runs(self):
+        clipped = self.clip((0, 0), (0, 2), (0.5, 0))
+        self.assertEqual(clipped.runs.tolist(), [0, 2])
+
+
+def area(vertices: np.ndarray) -> float:
+    x, y = vertices[:, 0], vertices[:, 1]
+    return abs(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1))) / 2
+
+
+class ClassifyBoundsTest(unittest.TestCase):
+    boxes = np.array([
+        [[-0.5, -0.5], [0.5, 0.5]],  # inside
+        [[2, 2], [3, 3]],            # outside
+        [[0.5, 0.5], [1.5, 1.5]],    # across a corner
+        [[-5, -5], [5, 5]],          # around the window
+        [[-1, -1], [1, 1]],          # the window itself
+    ])
+
+    def test_window(self):
+        window = Window(Vec2(-1, -1), Vec2(1, 1))
+        inside, outside = classify_bounds(self.boxes, ndc_matrix(window))
+        self.assertEqual(inside.tolist(), [True, False, False, False, True])
+        self.assertEqual(
+            outside.tolist(), [False, True, False, False, False]
+        )
+
+    def test_rotated_window(self):
+        # Turned by 45 degrees, the window no longer holds its own box.
+        window = Window(Vec2(-1, -1), Vec2(1, 1), angle=45)
+        inside, outside = classify_bounds(self.boxes, ndc_matrix(window))
+        self.assertEqual(inside.tolist(), [True, False, False, False, False])
+        self.assertEqual(
+            outside.tolist(), [False, True, False, False, False]
+        )
+
+
+class PolygonClipTest(unittest.TestCase):
+    def clip(self, *points):
+        polygon = Polygon([Vec2(x, y) for x, y in points])
+        polygon.update_ndc(Window(Vec2(-1, -1), Vec2(1, 1)))
+        return poly_clip(polygon)
+
+    def test_inside(self):
+        points = [(-0.5, -0.5), (0.5, -0.5), (0, 0.5)]
+        np.testing.assert_allclose(
+            self.clip(*points).vertices_ndc[:, :2], points
+        )
+
+    def test_outside(self):
+        self.assertIsNone(self.clip((2, 2), (3, 2), (3, 3)))
+
+    def test_crossing_one_side(self):
+        clipped = self.clip((-2, -0.5), (0.5, -0.5), (0.5, 0.5), (-2, 0.5))
+        vertices = clipped.vertices_ndc
+        self.assertEqual(vertices[:, 0].min(), -1)
+        self.assertAlmostEqual(area(vertices), 1.5)
+
+    def test_around_window(self):
+        clipped = self.clip((-5, -5), (5, -5), (0, 5))
+        self.assertAlmostEqual(area(clipped.vertices_ndc), 4)
+
+    def test_corner(self):
+        # The window's top right quarter, less the corner past the
+        # hypotenuse.
+        clipped = self.clip((0, 0), (1.5, 0), (0, 1.5))
+        self.assertAlmostEqual(area(clipped.vertices_ndc), 0.875)
+        self.assertEqual(len(clipped.vertices_ndc), 5)
+
+
+class SegmentClipTest(unittest.TestCase):
+    '''The segment kernels against the per-line clippers they batch.'''
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        window = Window(Vec2(-1, -1), Vec2(1, 1))
+        self.lines = []
+        for (x0, y0), (x1, y1) in rng.uniform(-3, 3, (500, 2, 2)):
+            line = Line(Vec2(x0, y0), Vec2(x1, y1))
+            line.update_ndc(window)
+            self.lines.append(line)
+        # Along and across the boundaries.
+        for start, end in [
+            ((-2, 1), (2, 1)), ((-1, -2), (-1, 2)), ((-2, 0), (2, 0)),
+            ((0.5, 0.5), (0.2, -0.3)), ((1.5, 2), (2, 1.5)),
+        ]:
+            line = Line(Vec2(*start), Vec2(*end))
+            line.update_ndc(window)
+            self.lines.append(line)
+        self.segments = np.stack([line.vertices_ndc for line in self.lines])
+
+    def check(self, kernel, line_clip):
+        visible, clipped = kernel(self.segments)
+        for line, is_visible, segment in zip(self.lines, visible, clipped):
+            expected = line_clip(line)
+            self.assertEqual(is_visible, expected is not None)
+            if expected is not None:
+                np.testing.assert_allclose(
+                    segment[:, :2], expected.vertices_ndc[:, :2], atol=1e-12
+                )
+
+    def test_cohen_sutherland(self):
+        self.check(cohen_sutherland_clip_segments, cohen_sutherland_line_clip)
+
+    def test_liang_barsky(self):
+        self.check(liang_barsky_clip_segments, liang_barsky_line_clip)
+
+
+if __name__ == '__main__':
+    unittest.main()
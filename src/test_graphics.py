@@ -0,0 +1,198 @@
+import unittest
+
+import numpy as np
+
+from graphics import Curve, Polygon, Vec2, Window
+from transformations import ndc_matrix
+
+POINTS = [Vec2(0, 0), Vec2(10, 40), Vec2(30, -20), Vec2(40, 10),
+          Vec2(60, 30), Vec2(70, -10), Vec2(90, 0)]
+
+
+def distances_to_polyline(points: np.ndarray, polyline: np.ndarray):
+    '''Distance from each of `points` to the nearest segment.'''
+    a, b = polyline[:-1, np.newaxis, :2], polyline[1:, np.newaxis, :2]
+    ab = b - a
+    t = ((points[:, :2] - a) * ab).sum(axis=2) / (ab * ab).sum(axis=2)
+    nearest = a + np.clip(t, 0, 1)[..., np.newaxis] * ab
+    return np.linalg.norm(points[:, :2] - nearest, axis=2).min(axis=0)
+
+
+class BoundsTest(unittest.TestCase):
+    def setUp(self):
+        self.polygon = Polygon([Vec2(0, 0), Vec2(4, 0), Vec2(4, 2)])
+
+    def test_bounds_and_centroid(self):
+        np.testing.assert_array_equal(self.polygon.bounds(), [[0, 0], [4, 2]])
+        np.testing.assert_allclose(self.polygon.centroid[:2], [8 / 3, 2 / 3])
+
+    def test_cached_until_changed(self):
+        bounds = self.polygon.bounds()
+        self.assertIs(self.polygon.bounds(), bounds)
+        self.assertFalse(bounds.flags.writeable)
+
+        self.polygon.vertices[1] = [10, -1, 1]
+        self.polygon.changed()
+        np.testing.assert_array_equal(
+            self.polygon.bounds(), [[0, -1], [10, 2]]
+        )
+        np.testing.assert_allclose(self.polygon.centroid[:2], [14 / 3, 1 / 3])
+
+    def test_empty(self):
+        self.assertTrue(np.isnan(Polygon([]).bounds()).all())
+
+
+class ModelTransformTest(unittest.TestCase):
+    def setUp(self):
+        self.polygon = Polygon([Vec2(0, 0), Vec2(4, 0), Vec2(4, 2)])
+        self.stored = self.polygon._local_vertices.copy()
+        self.polygon.rotate(np.pi / 2, Vec2(1, 1))
+        self.polygon.translate(Vec2(3, 0))
+        self.polygon.scale(Vec2(2, 2))
+
+    def baked(self) -> Polygon:
+        polygon = Polygon(self.stored)
+        polygon.rotate(np.pi / 2, Vec2(1, 1))
+        polygon.translate(Vec2(3, 0))
+        polygon.scale(Vec2(2, 2))
+        polygon.bake()
+        return polygon
+
+    def test_deferred(self):
+        self.assertIsNotNone(self.polygon._model)
+        np.testing.assert_array_equal(
+            self.polygon._local_vertices, self.stored
+        )
+
+    def test_derived_before_baking(self):
+        baked = self.baked()
+        # Transformed from the cached box, so only tight for axis-aligned
+        # models.
+        (xmin, ymin), (xmax, ymax) = self.polygon.bounds()
+        (bx0, by0), (bx1, by1) = baked.bounds()
+        self.assertTrue(xmin <= bx0 + 1e-9 and ymin <= by0 + 1e-9)
+        self.assertTrue(xmax >= bx1 - 1e-9 and ymax >= by1 - 1e-9)
+        np.testing.assert_allclose(self.polygon.centroid, baked.centroid)
+
+        window = Window(Vec2(-10, -10), Vec2(10, 10))
+        self.polygon.update_ndc(window)
+        np.testing.assert_allclose(
+            self.polygon.vertices_ndc, baked.vertices @ ndc_matrix(window)
+        )
+
+    def test_vertices_bake(self):
+        np.testing.assert_allclose(
+            self.polygon.vertices, self.baked().vertices
+        )
+        self.assertIsNone(self.polygon._model)
+
+
+def bernstein(points: np.ndarray, t: float) -> np.ndarray:
+    '''The cubic Bezier of four `points` at `t`, from its definition.'''
+    weights = [(1 - t)**3, 3 * t * (1 - t)**2, 3 * t**2 * (1 - t), t**3]
+    return np.dot(weights, points)
+
+
+def bspline(points: np.ndarray, t: float) -> np.ndarray:
+    '''The uniform cubic B-spline segment of four `points` at `t`.'''
+    weights = np.array([
+        (1 - t)**3,
+        3 * t**3 - 6 * t**2 + 4,
+        -3 * t**3 + 3 * t**2 + 3 * t + 1,
+        t**3,
+    ]) / 6
+    return np.dot(weights, points)
+
+
+class CurveTessellationTest(unittest.TestCase):
+    def test_fixed_bezier_ends(self):
+        vertices = Curve.fixed_vertices(
+            np.array(POINTS), 'bezier', n_points=10
+        )
+        self.assertEqual(len(vertices), 20)
+        np.testing.assert_allclose(vertices[0], POINTS[0])
+        np.testing.assert_allclose(vertices[-1], POINTS[-1])
+
+    def test_fixed_bezier(self):
+        points = np.array(POINTS)[:, :2]
+        vertices = Curve.fixed_vertices(
+            np.array(POINTS), 'bezier', n_points=5
+        )
+        for i, segment in enumerate((points[0:4], points[3:7])):
+            for k, t in enumerate(np.linspace(0, 1, 5)):
+                np.testing.assert_allclose(
+                    vertices[5 * i + k, :2], bernstein(segment, t)
+                )
+
+    def test_fixed_bspline(self):
+        # Forward differencing accumulates; it must stay on the curve.
+        points = np.array(POINTS)[:, :2]
+        vertices = Curve.fixed_vertices(
+            np.array(POINTS), 'b-spline', n_points=50
+        )
+        self.assertEqual(len(vertices), 4 * 51)
+        for i in range(4):
+            for k, t in enumerate(np.linspace(0, 1, 51)):
+                np.testing.assert_allclose(
+                    vertices[51 * i + k, :2],
+                    bspline(points[i:i + 4], t),
+                    atol=1e-9,
+                )
+
+    def test_adaptive_within_tolerance(self):
+        points = np.array(POINTS)
+        for kind in ('bezier', 'b-spline'):
+            dense = Curve.fixed_vertices(points, kind, n_points=400)
+            for tolerance in (4.0, 0.5, 0.05):
+                vertices = Curve.adaptive_vertices(points, kind, tolerance)
+                self.assertLessEqual(
+                    distances_to_polyline(dense, vertices).max(),
+                    tolerance,
+                )
+
+    def test_finer_tolerance_adds_vertices(self):
+        curve = Curve.from_control_points(POINTS, type='b-spline')
+        self.assertTrue(curve.tessellate(1.0))
+        coarse = len(curve.vertices)
+        self.assertTrue(curve.tessellate(0.01))
+        self.assertGreater(len(curve.vertices), coarse)
+
+    def test_lod_buckets(self):
+        curve = Curve.from_control_points(POINTS)
+        self.assertTrue(curve.tessellate(1.0))
+        # Same power of two.
+        self.assertFalse(curve.tessellate(1.5))
+
+        coarse = curve.vertices.copy()
+        curve.tessellate(0.1)
+        curve.tessellate(1.0)
+        self.assertEqual(len(curve._lods), 2)
+        np.testing.assert_array_equal(curve.vertices, coarse)
+
+    def test_lod_cache_bounded(self):
+        curve = Curve.from_control_points(POINTS)
+        for lod in range(Curve.LOD_CACHE_SIZE + 4):
+            curve.tessellate(2.0 ** -lod)
+        self.assertEqual(len(curve._lods), Curve.LOD_CACHE_SIZE)
+
+    def test_tolerance_follows_model_scale(self):
+        curve = Curve.from_control_points(POINTS)
+        curve.scale(Vec2(4, 4))
+        curve.tessellate(1.0)
+        self.assertEqual(curve._lod, -2)
+
+    def test_explicit_vertices_drop_control_points(self):
+        curve = Curve.from_control_points(POINTS)
+        curve.vertices = [Vec2(0, 0), Vec2(1, 1)]
+        self.assertIsNone(curve.control_points)
+        self.assertFalse(curve.tessellate(0.1))
+
+    def test_bezier_basis_cached(self):
+        basis = Curve.bezier_basis(7)
+        self.assertIs(Curve.bezier_basis(7), basis)
+        self.assertFalse(basis.flags.writeable)
+        np.testing.assert_allclose(basis.sum(axis=1), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
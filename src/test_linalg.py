@@ -0,0 +1,50 @@
+import unittest
+
+import numpy as np
+
+from linalg import (
+    array_to_points,
+    Point2,
+    Point3,
+    points_to_array,
+    Vec2,
+    Vec3,
+)
+
+
+class PointTest(unittest.TestCase):
+    def test_arithmetic_like_vec2(self):
+        a, b = Point2(1, 2), Point2(-3, 0.5)
+        va, vb = Vec2(1, 2), Vec2(-3, 0.5)
+        for point, vec in (
+            (a + b, va + vb),
+            (a - b, va - vb),
+            (a * 2, va * 2),
+            (2 * a, 2 * va),
+            (a / 4, va / 4),
+            (-a, -va),
+        ):
+            self.assertEqual((point.x, point.y), (vec[0], vec[1]))
+
+    def test_homogeneous(self):
+        self.assertEqual(list(Point2(1, 2)), [1, 2, 1])
+        self.assertEqual(len(Point2()), 3)
+        self.assertEqual(list(Point3(1, 2, 3)), [1, 2, 3, 1])
+        self.assertEqual(Point3(1, 2, 3) + Vec3(1, 1, 1), Point3(2, 3, 4))
+
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            Point2().z = 1
+
+    def test_arrays(self):
+        points = [Point2(1, 2), Point2(3, 4)]
+        array = points_to_array(points)
+        np.testing.assert_array_equal(array, [[1, 2, 1], [3, 4, 1]])
+        self.assertEqual(array_to_points(array), points)
+
+        array = points_to_array([Point3(1, 2, 3)])
+        np.testing.assert_array_equal(array, [[1, 2, 3, 1]])
+
+
+if __name__ == '__main__':
+    unittest.main()
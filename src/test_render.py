@@ -0,0 +1,234 @@
+import io
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+from unittest import mock
+
+try:
+    import cairo
+except ImportError:
+    raise unittest.SkipTest('drawing needs pycairo')
+
+import numpy as np
+
+from clipping import LineClippingMethod
+from graphics import ClippedGeometry, Line, Point, Polygon, Rect, Vec2, Window
+from render import (
+    draw_clipped,
+    draw_frame,
+    main,
+    RetainedFrame,
+    signed_areas,
+    TileCache,
+)
+from scene import Scene
+from transformations import ndc_matrix, viewport_matrix
+
+WIDTH, HEIGHT = 300, 200
+
+
+def make_scene() -> Scene:
+    objs = [
+        Point(Vec2(10, 10)),
+        Line(Vec2(-20, 5), Vec2(120, 95)),
+        Line(Vec2(30, -10), Vec2(30, 110)),
+        Polygon(
+            [Vec2(40, 20), Vec2(90, 30), Vec2(70, 80), Vec2(45, 60)],
+            filled=True,
+        ),
+        Polygon([Vec2(-10, 40), Vec2(20, 90), Vec2(60, 50)]),
+    ]
+    return Scene(objs, window=Window(Vec2(0, 0), Vec2(150, 100)))
+
+
+class FrameTest(unittest.TestCase):
+    method = LineClippingMethod.LIANG_BARSKY
+    # Whole pixel pans, at 2 pixels per world unit.
+    pans = [Vec2(5, 0), Vec2(0, -7.5), Vec2(-12, 4), Vec2(80, 0)]
+
+    def render(self, scene: Scene, frame=None) -> np.ndarray:
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, WIDTH, HEIGHT)
+        cr = cairo.Context(surface)
+        cr.set_source_rgb(1, 1, 1)
+        viewport = Rect(Vec2(0, 0), Vec2(WIDTH, HEIGHT))
+        draw_frame(cr, scene, viewport, self.method, frame)
+        surface.flush()
+        return np.frombuffer(surface.get_data(), dtype=np.uint8).copy()
+
+    def assertSamePixels(self, expected: np.ndarray, actual: np.ndarray):
+        # Antialiasing along strip and tile seams may differ slightly.
+        diff = np.abs(expected.astype(int) - actual.astype(int))
+        self.assertLessEqual(np.count_nonzero(diff > 16), 4)
+        self.assertGreater(np.count_nonzero(expected != 255), 0)
+
+    def check_pans(self, frame: RetainedFrame):
+        scene, reference = make_scene(), make_scene()
+        pixels = self.render(scene, frame)
+        self.assertSamePixels(self.render(reference), pixels)
+        for offset in self.pans:
+            scene.translate_window(offset)
+            reference.translate_window(offset)
+            with mock.patch.object(
+                frame, '_render_all', wraps=frame._render_all
+            ) as render_all:
+                pixels = self.render(scene, frame)
+            render_all.assert_not_called()
+            self.assertSamePixels(self.render(reference), pixels)
+
+    def test_retained_pan(self):
+        self.check_pans(RetainedFrame())
+
+    def test_tile_cache(self):
+        self.check_pans(RetainedFrame(TileCache()))
+
+    def test_tile_cache_edit(self):
+        scene, reference = make_scene(), make_scene()
+        frame = RetainedFrame(TileCache())
+        self.render(scene, frame)
+        for s in (scene, reference):
+            s.objs[1].translate(Vec2(0, 20))
+            s.translate_window(Vec2(5, 0))
+        pixels = self.render(scene, frame)
+        self.assertSamePixels(self.render(reference), pixels)
+
+    def test_zoom_renders_all(self):
+        scene, reference = make_scene(), make_scene()
+        frame = RetainedFrame()
+        self.render(scene, frame)
+        for s in (scene, reference):
+            s.zoom_window(0.5)
+        with mock.patch.object(
+            frame, '_render_all', wraps=frame._render_all
+        ) as render_all:
+            pixels = self.render(scene, frame)
+        render_all.assert_called_once()
+        self.assertSamePixels(self.render(reference), pixels)
+
+
+class DrawClippedTest(unittest.TestCase):
+    '''Paths recorded from a stand-in context.'''
+
+    def draw(self, clipped):
+        cr = mock.Mock()
+        draw_clipped(cr, clipped, np.eye(3))
+        return [(name, args) for name, args, _ in cr.mock_calls]
+
+    def test_one_paint_per_style(self):
+        square = [[0, 0, 1], [1, 0, 1], [1, 1, 1], [0, 1, 1]]
+        polygons = [Polygon([], filled=True) for _ in range(3)]
+        line, point = Line(Vec2(0, 0), Vec2(1, 1)), Point(Vec2(0, 0))
+        clipped = [ClippedGeometry(line, np.array(square[:2]))] + [
+            ClippedGeometry(p, np.array(square)) for p in polygons
+        ] + [ClippedGeometry(point, np.array(square[:1]))]
+
+        names = [name for name, _ in self.draw(clipped)]
+        paints = [
+            name for name in names
+            if name in ('stroke_preserve', 'stroke', 'fill')
+        ]
+        # Filled, then stroked, then dots.
+        self.assertEqual(paints, ['stroke_preserve', 'fill', 'stroke', 'fill'])
+        self.assertEqual(names.count('close_path'), 3)
+        self.assertLess(names.index('close_path'), names.index('arc'))
+
+    def test_fills_share_orientation(self):
+        square = np.array([[0, 0, 1], [1, 0, 1], [1, 1, 1], [0, 1, 1]])
+        clipped = [
+            ClippedGeometry(Polygon([], filled=True), square),
+            ClippedGeometry(Polygon([], filled=True), square[::-1]),
+        ]
+        calls = self.draw(clipped)
+        points = np.array([
+            args for name, args in calls if name in ('move_to', 'line_to')
+        ])
+        first, second = points[:4], points[4:]
+        np.testing.assert_array_equal(first, second)
+
+    def test_signed_areas(self):
+        points = np.array([
+            [0, 0], [2, 0], [2, 1], [0, 1],
+            [0, 0], [0, 3], [1, 0],
+        ], dtype=float)
+        np.testing.assert_allclose(
+            signed_areas(points, np.array([0, 4]), np.array([4, 7])),
+            [4, -3],
+        )
+        empty = np.array([], dtype=int)
+        self.assertEqual(len(signed_areas(points, empty, empty)), 0)
+
+
+class ShiftTest(unittest.TestCase):
+    '''When the retained frame can be shifted instead of rendered.'''
+
+    def setUp(self):
+        self.scene = make_scene()
+        self.frame = RetainedFrame()
+        self.frame._state, self.frame._matrix = self.state()
+
+    def state(self, method=LineClippingMethod.LIANG_BARSKY):
+        vp_matrix = viewport_matrix(Rect(Vec2(0, 0), Vec2(WIDTH, HEIGHT)))
+        state = (self.scene, self.scene.edit_version, method, WIDTH, HEIGHT)
+        return state, ndc_matrix(self.scene.window) @ vp_matrix
+
+    def test_unchanged(self):
+        self.assertEqual(self.frame._shift(*self.state()), (0, 0))
+
+    def test_whole_pixel_pan(self):
+        # 2 pixels per world unit. Moving the window down moves the
+        # content up, and y grows down on screen.
+        self.scene.translate_window(Vec2(5, -7.5))
+        self.assertEqual(self.frame._shift(*self.state()), (-10, -15))
+
+    def test_sub_pixel_pan(self):
+        self.scene.translate_window(Vec2(0.1, 0))
+        self.assertIsNone(self.frame._shift(*self.state()))
+
+    def test_zoom(self):
+        self.scene.zoom_window(0.5)
+        self.assertIsNone(self.frame._shift(*self.state()))
+
+    def test_edit(self):
+        self.scene.objs[1].translate(Vec2(1, 0))
+        self.assertIsNone(self.frame._shift(*self.state()))
+
+    def test_method(self):
+        state = self.state(LineClippingMethod.COHEN_SUTHERLAND)
+        self.assertIsNone(self.frame._shift(*state))
+
+    def test_invalidate(self):
+        self.frame.invalidate()
+        self.assertIsNone(self.frame._shift(*self.state()))
+
+
+class MainTest(unittest.TestCase):
+    def test_errors_reported_per_file(self):
+        loaded = make_scene()
+        errors = {
+            'big.obj': MemoryError(),
+            'bad.obj': cairo.Error('invalid matrix'),
+        }
+
+        def load_scene(source):
+            if source in errors:
+                raise errors[source]
+            return loaded
+
+        with tempfile.TemporaryDirectory() as directory:
+            argv = ['render', 'big.obj', 'bad.obj', 'ok.obj', '-o', directory]
+            stderr = io.StringIO()
+            with mock.patch.multiple(
+                'render', load_scene=load_scene, render_scene=mock.DEFAULT
+            ) as patched, mock.patch.object(sys, 'argv', argv):
+                with redirect_stderr(stderr):
+                    with self.assertRaises(SystemExit) as exit:
+                        main()
+
+        self.assertEqual(exit.exception.code, 1)
+        self.assertEqual(
+            stderr.getvalue().splitlines(),
+            ['big.obj: MemoryError', 'bad.obj: invalid matrix'],
+        )
+        render_scene = patched['render_scene']
+        render_scene.assert_called_once()
+        self.assertIs(render_scene.call_args[0][0], loaded)
@@ -0,0 +1,380 @@
+import unittest
+
+import numpy as np
+
+from clipping import LineClippingMethod
+from graphics import Curve, Line, Point, Polygon, Vec2, Window
+from scene import Scene
+from spatial import overlapping
+from transformations import ndc_matrix
+
+
+def squares(n=10):
+    return [
+        Polygon([Vec2(i, 0), Vec2(i + .5, 0), Vec2(i + .5, .5), Vec2(i, .5)])
+        for i in range(n)
+    ]
+
+
+def shapes(seed=0, n=80):
+    '''Points, lines, polygons and polylines in and around (0, 0)-(100,
+    100).'''
+    rng = np.random.RandomState(seed)
+    objs = []
+    for i in range(n):
+        x, y = rng.uniform(-50, 150, 2)
+        around = [
+            Vec2(x + dx, y + dy) for dx, dy in rng.uniform(-30, 30, (5, 2))
+        ]
+        kind = i % 4
+        if kind == 0:
+            objs.append(Point(Vec2(x, y)))
+        elif kind == 1:
+            objs.append(Line(Vec2(x, y), around[0]))
+        elif kind == 2:
+            objs.append(Polygon(around, filled=i % 8 == 2))
+        else:
+            objs.append(Curve(around))
+    return objs
+
+
+def brute_force(objs, window, method):
+    '''Clips every object on its own, as if there were no scene.'''
+    clipped = []
+    for obj in objs:
+        obj.update_ndc(window)
+        result = obj.clipped(method)
+        if result is not None:
+            clipped.append(result)
+    return clipped
+
+
+class SceneClipTest(unittest.TestCase):
+    '''Edits a scene and a plain list of the same objects alike, and clips
+    both.'''
+
+    def setUp(self):
+        self.scene = Scene(shapes(), Window(Vec2(0, 0), Vec2(100, 100)))
+        self.reference = shapes()
+
+    def apply(self, edit):
+        edit(self.scene.objs)
+        edit(self.reference)
+
+    def assertClipsLikeBruteForce(self):
+        for method in LineClippingMethod:
+            clipped = self.scene.clip_objects(method)
+            expected = brute_force(
+                self.reference, self.scene.window, method
+            )
+            self.assertEqual(
+                [self.scene.objs.index(c.source) for c in clipped],
+                [self.reference.index(c.source) for c in expected],
+            )
+            for got, want in zip(clipped, expected):
+                np.testing.assert_allclose(
+                    got.vertices_ndc, want.vertices_ndc, atol=1e-12
+                )
+                if want.runs is None:
+                    self.assertIsNone(got.runs)
+                else:
+                    np.testing.assert_array_equal(got.runs, want.runs)
+
+    def test_initial(self):
+        self.assertClipsLikeBruteForce()
+
+    def test_add(self):
+        self.assertClipsLikeBruteForce()
+        for obj in shapes(seed=1, n=20):
+            self.scene.add_object(obj)
+        self.reference.extend(shapes(seed=1, n=20))
+        self.assertClipsLikeBruteForce()
+
+    def test_remove(self):
+        self.assertClipsLikeBruteForce()
+        indexes = list(range(0, 80, 3))
+        self.scene.remove_objects(indexes)
+        for i in reversed(indexes):
+            del self.reference[i]
+        self.assertClipsLikeBruteForce()
+
+        # Enough holes to compact the store.
+        self.scene.remove_objects(range(40))
+        del self.reference[:40]
+        self.assertClipsLikeBruteForce()
+
+    def test_transform(self):
+        self.assertClipsLikeBruteForce()
+
+        def edit(objs):
+            for obj in objs[::5]:
+                obj.translate(Vec2(20, -10))
+            for obj in objs[1::7]:
+                obj.rotate(0.5, Vec2(50, 50))
+            for obj in objs[2::9]:
+                obj.scale(Vec2(1.5, 0.5))
+
+        self.apply(edit)
+        self.assertClipsLikeBruteForce()
+
+    def test_edit_vertices(self):
+        self.assertClipsLikeBruteForce()
+
+        def edit(objs):
+            objs[1].end = Vec2(200, 50)
+            objs[2].vertices = [Vec2(10, 10), Vec2(90, 10), Vec2(50, 90)]
+
+        self.apply(edit)
+        self.assertClipsLikeBruteForce()
+
+    def test_pan_and_zoom(self):
+        for offset in (Vec2(30, 0), Vec2(-70, 45), Vec2(0, 0.5)):
+            self.scene.translate_window(offset)
+            self.assertClipsLikeBruteForce()
+        self.scene.zoom_window(0.25)
+        self.assertClipsLikeBruteForce()
+        self.scene.zoom_window(8)
+        self.assertClipsLikeBruteForce()
+
+
+class SceneNdcTest(unittest.TestCase):
+    def setUp(self):
+        self.objs = shapes()
+        # Sees every object.
+        self.scene = Scene(self.objs, Window(Vec2(-90, -90), Vec2(190, 190)))
+
+    def assertNdcCurrent(self, objs):
+        t_matrix = ndc_matrix(self.scene.window)
+        for obj in objs:
+            np.testing.assert_allclose(
+                obj.vertices_ndc, obj.vertices @ t_matrix, atol=1e-12
+            )
+
+    def test_only_edited_objects_are_stale(self):
+        self.scene.update_ndc()
+        in_view = self.scene.visible_objects()
+        self.assertEqual(self.scene._stale(in_view), [])
+
+        in_view[0].translate(Vec2(1, 1))
+        self.assertEqual(self.scene._stale(in_view), [in_view[0]])
+        self.scene.update_ndc()
+        self.assertNdcCurrent(in_view)
+
+    def test_pan_projects_whole_store(self):
+        self.scene.update_ndc()
+        self.objs[5].translate(Vec2(10, 0))
+        self.scene.translate_window(Vec2(10, 10))
+        self.scene.update_ndc()
+        self.assertEqual(
+            self.scene._store_ndc_version, self.scene.window_version
+        )
+        self.assertNdcCurrent(self.scene.visible_objects())
+
+    def test_edited_out_of_view(self):
+        self.scene.window = Window(Vec2(-90, -90), Vec2(100, 190))
+        self.scene.update_ndc()
+        in_view = set(self.scene.visible_objects())
+        hidden = [obj for obj in self.objs if obj not in in_view]
+        hidden[0].translate(Vec2(1, 0))
+
+        self.scene.translate_window(Vec2(1, 0))
+        self.scene.update_ndc()
+        self.assertEqual(
+            self.scene._store_ndc_version, self.scene.window_version
+        )
+        self.assertEqual(self.scene._stale(hidden), [])
+        self.assertEqual(
+            self.scene._ndc_version[hidden[0]], self.scene.window_version
+        )
+        self.assertNdcCurrent(hidden)
+
+    def test_few_stale_objects_projected_alone(self):
+        self.scene.window = Window(Vec2(0, 0), Vec2(10, 10))
+        self.scene.update_ndc()
+        self.assertNotEqual(
+            self.scene._store_ndc_version, self.scene.window_version
+        )
+        self.assertNdcCurrent(self.scene.visible_objects())
+
+
+class SceneClipCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.objs = shapes()
+        self.scene = Scene(self.objs, Window(Vec2(0, 0), Vec2(100, 100)))
+        self.clipped = {c.source: c for c in self.scene.clip_objects()}
+
+    def assertReused(self, reused):
+        for c in self.scene.clip_objects():
+            if c.source in reused:
+                self.assertIs(c, self.clipped[c.source])
+            else:
+                self.assertIsNot(c, self.clipped.get(c.source))
+
+    def test_reused(self):
+        self.assertReused(set(self.clipped))
+
+    def test_edit_drops_only_that_object(self):
+        edited = next(iter(self.clipped))
+        edited.translate(Vec2(0.5, 0))
+        self.assertReused(set(self.clipped) - {edited})
+
+    def test_window_change_drops_all(self):
+        self.scene.translate_window(Vec2(1, 0))
+        self.assertReused(set())
+
+    def test_method_change_drops_all(self):
+        for c in self.scene.clip_objects(LineClippingMethod.LIANG_BARSKY):
+            self.assertIsNot(c, self.clipped[c.source])
+
+
+class SceneCurveTest(unittest.TestCase):
+    def setUp(self):
+        points = [Vec2(0, 0), Vec2(10, 40), Vec2(30, -20), Vec2(40, 10)]
+        self.curve = Curve.from_control_points(points, type='bezier')
+        self.line = Line(Vec2(0, 0), Vec2(40, 0))
+        self.scene = Scene(
+            [self.line, self.curve], Window(Vec2(-10, -20), Vec2(50, 40))
+        )
+
+    def test_kept_out_of_main_store(self):
+        self.assertIs(self.curve._store, self.scene.curve_store)
+        self.assertIs(self.line._store, self.scene.store)
+        self.assertIn(self.curve, self.scene.index)
+
+    def test_zoom_refines(self):
+        self.scene.clip_objects(viewport_width=600)
+        coarse = len(self.curve.vertices)
+        self.scene.zoom_window(1 / 16)
+        self.scene.clip_objects(viewport_width=600)
+        self.assertGreater(len(self.curve.vertices), coarse)
+
+        store, used = self.scene.store.world, self.scene.store.used
+        self.scene.zoom_window(16)
+        self.scene.clip_objects(viewport_width=600)
+        self.assertEqual(len(self.curve.vertices), coarse)
+        self.assertIs(self.scene.store.world, store)
+        self.assertEqual(self.scene.store.used, used)
+
+    def test_tessellating_is_not_an_edit(self):
+        version = self.scene.edit_version
+        edits = []
+        self.scene.on_edit = edits.append
+        self.scene.clip_objects(viewport_width=600)
+        self.assertEqual(self.scene.edit_version, version)
+        self.assertEqual(edits, [])
+
+    def test_removed(self):
+        self.scene.clip_objects(viewport_width=600)
+        self.scene.remove_objects([1])
+        self.assertNotIn(self.curve, self.scene.index)
+        self.assertIsNot(self.curve._store, self.scene.curve_store)
+        self.assertEqual(len(self.scene.clip_objects()), 1)
+
+
+class SceneIndexTest(unittest.TestCase):
+    def test_filled_after_adding(self):
+        scene = Scene(window=Window(Vec2(0, 0), Vec2(10, 10)))
+        polygon = Polygon([])
+        scene.add_object(polygon)
+        self.assertEqual(scene.visible_objects(), [])
+
+        polygon.vertices = [Vec2(1, 1), Vec2(4, 1), Vec2(2, 3)]
+        self.assertEqual(scene.visible_objects(), [polygon])
+        self.assertEqual(len(scene.clip_objects()), 1)
+
+    def test_edit_reports_old_and_new_box(self):
+        line = Line(Vec2(0, 0), Vec2(1, 1))
+        scene = Scene([line], Window(Vec2(0, 0), Vec2(10, 10)))
+        edits = []
+        scene.on_edit = edits.append
+
+        line.translate(Vec2(5, 0))
+        self.assertEqual(edits, [(0, 0, 1, 1), (5, 0, 6, 1)])
+
+    def test_edits_hit_tiles(self):
+        # The bookkeeping of the tile cache, without drawing tiles.
+        scene = Scene(window=Window(Vec2(0, 0), Vec2(10, 10)))
+        edits = []
+        scene.on_edit = edits.append
+        scene.add_object(Line(Vec2(0, 0), Vec2(1, 2)))
+        scene.add_object(Line(Vec2(20, 0), Vec2(21, 2)))
+        scene.remove_objects([1])
+        self.assertEqual(
+            edits, [(0, 0, 1, 2), (20, 0, 21, 2), (20, 0, 21, 2)]
+        )
+
+        tiles = [(-5, -5, 0, 0), (5, 5, 15, 15), (18, -2, 30, 0)]
+        self.assertEqual(
+            overlapping(tiles, edits).tolist(), [True, False, True]
+        )
+
+
+class SceneModelTest(unittest.TestCase):
+    def test_compaction_keeps_pending_transform(self):
+        lines = [Line(Vec2(i, 0), Vec2(i, 1)) for i in range(8)]
+        scene = Scene(lines, Window(Vec2(-10, -10), Vec2(10, 10)))
+        lines[7].translate(Vec2(2, 3))
+
+        store = scene.store
+        scene.remove_objects(range(7))
+        self.assertIsNot(scene.store, store)
+        self.assertIsNotNone(lines[7]._model)
+        np.testing.assert_allclose(
+            lines[7].vertices[:, :2], [[9, 3], [9, 4]]
+        )
+
+
+class SceneViewTest(unittest.TestCase):
+    def setUp(self):
+        self.scene = Scene(squares(), Window(Vec2(-1, -1), Vec2(11, 2)))
+        self.expected = Scene(squares(), Window(Vec2(-1, -1), Vec2(11, 2)))
+
+    def assertClippedAsExpected(self):
+        clipped = self.scene.clip_objects()
+        expected = self.expected.clip_objects()
+        self.assertEqual(len(clipped), len(expected))
+        for got, want in zip(clipped, expected):
+            np.testing.assert_allclose(got.vertices_ndc, want.vertices_ndc)
+
+    def test_keeps_cache_of_other_objects(self):
+        scene = self.scene
+        scene.clip_objects()
+        version = scene.window_version
+        cached = scene._clip_cache[scene.objs[9]]
+
+        with scene.viewed_through(Window(Vec2(-1, -1), Vec2(.8, .8))):
+            self.assertEqual(len(scene.clip_objects()), 1)
+
+        self.assertEqual(scene.window_version, version)
+        self.assertIs(scene._clip_cache[scene.objs[9]], cached)
+        self.assertNotIn(scene.objs[0], scene._clip_cache)
+        self.assertClippedAsExpected()
+
+    def test_whole_store_projected(self):
+        with self.scene.viewed_through(Window(Vec2(-5, -5), Vec2(15, 5))):
+            self.scene.clip_objects()
+        self.assertClippedAsExpected()
+        self.scene.zoom_window(0.5)
+        self.expected.zoom_window(0.5)
+        self.assertClippedAsExpected()
+
+    def test_versions_not_reused(self):
+        scene = Scene(squares(20), Window(Vec2(-1, -1), Vec2(14.8, 2)))
+        with scene.viewed_through(Window(Vec2(18.8, -1), Vec2(19.8, 1))):
+            scene.clip_objects()
+        # Projects the whole store, for most of it is in view.
+        scene.clip_objects()
+        self.assertEqual(scene._store_ndc_version, scene.window_version)
+
+        scene.translate_window(Vec2(17, 0))
+        sources = [c.source for c in scene.clip_objects()]
+        self.assertIn(scene.objs[19], sources)
+        t_matrix = ndc_matrix(scene.window)
+        for obj in sources:
+            np.testing.assert_allclose(
+                obj.vertices_ndc, obj.vertices @ t_matrix
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+
+import numpy as np
+
+from spatial import overlapping, overlaps, UniformGrid
+
+
+def random_boxes(rng, n, extent=1000, size=60):
+    mins = rng.uniform(-extent, extent, (n, 2))
+    return [
+        np.array([xy, xy + rng.uniform(0, size, 2)])
+        for xy in mins
+    ]
+
+
+class UniformGridTest(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.RandomState(0)
+        self.grid = UniformGrid(cell_size=50, max_cells=4)
+        self.boxes = dict(enumerate(random_boxes(self.rng, 300)))
+        # Large enough to skip the cells.
+        self.boxes[300] = np.array([[-500, -500], [500, 500]])
+        for item, bounds in self.boxes.items():
+            self.grid.insert(item, bounds)
+
+    def assertQueriesMatch(self):
+        for bounds in random_boxes(self.rng, 50, size=400):
+            box = tuple(bounds.ravel())
+            expected = {
+                item for item, other in self.boxes.items()
+                if overlaps(tuple(other.ravel()), box)
+            }
+            self.assertEqual(set(self.grid.query(bounds)), expected)
+
+    def test_query(self):
+        self.assertIn(300, self.grid.large)
+        self.assertQueriesMatch()
+
+    def test_whole_extent(self):
+        bounds = np.array([[-1e4, -1e4], [1e4, 1e4]])
+        self.assertEqual(set(self.grid.query(bounds)), set(self.boxes))
+
+    def test_update_and_remove(self):
+        for item in range(0, 300, 3):
+            self.boxes[item] = self.boxes[item] + self.rng.uniform(-200, 200)
+            self.grid.update(item, self.boxes[item])
+        for item in range(1, 300, 3):
+            del self.boxes[item]
+            self.grid.remove(item)
+        del self.boxes[300]
+        self.grid.remove(300)
+
+        self.assertEqual(len(self.grid), len(self.boxes))
+        self.assertNotIn(1, self.grid)
+        self.assertQueriesMatch()
+
+    def test_empty_until_updated(self):
+        empty = np.full((2, 2), np.nan)
+        self.grid.insert('empty', empty)
+        self.assertIn('empty', self.grid)
+        self.assertNotIn('empty', self.grid.bounds)
+
+        self.boxes['empty'] = np.array([[0, 0], [1, 1]])
+        self.grid.update('empty', self.boxes['empty'])
+        self.assertNotIn('empty', self.grid.empty)
+        self.assertQueriesMatch()
+
+        self.grid.remove('empty')
+        self.assertNotIn('empty', self.grid)
+
+
+class OverlappingTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(1)
+        self.boxes = [
+            tuple(b.ravel()) for b in random_boxes(rng, 40, size=300)
+        ]
+        self.others = [tuple(b.ravel()) for b in random_boxes(rng, 25)]
+
+    def test_matches_overlaps(self):
+        expected = [
+            any(overlaps(box, other) for other in self.others)
+            for box in self.boxes
+        ]
+        self.assertTrue(any(expected) and not all(expected))
+        for chunk_size in (1, 7, 4096):
+            self.assertEqual(
+                overlapping(self.boxes, self.others, chunk_size).tolist(),
+                expected,
+            )
+
+    def test_touching(self):
+        hit = overlapping([(0, 0, 1, 1), (2, 2, 3, 3)], [(1, 1, 2, 1.5)])
+        self.assertEqual(hit.tolist(), [True, False])
+
+    def test_empty(self):
+        self.assertEqual(overlapping([], self.others).tolist(), [])
+        self.assertEqual(
+            overlapping(self.boxes, []).tolist(), [False] * len(self.boxes)
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+
+import numpy as np
+
+from graphics import Rect, Vec2, Window
+from transformations import (
+    ndc_matrix,
+    offset_matrices,
+    offset_matrix,
+    rotation_about_matrix,
+    rotation_matrices,
+    rotation_matrix,
+    scale_about_matrix,
+    scale_matrices,
+    scale_matrix,
+    viewport_matrix,
+)
+
+
+class ClosedFormTest(unittest.TestCase):
+    '''Closed forms against the products they multiply out.'''
+
+    def test_scale_about(self):
+        np.testing.assert_allclose(
+            scale_about_matrix(2, 3, 5, -1),
+            offset_matrix(-5, 1) @ scale_matrix(2, 3) @ offset_matrix(5, -1),
+        )
+
+    def test_rotation_about(self):
+        np.testing.assert_allclose(
+            rotation_about_matrix(30, 5, -1),
+            offset_matrix(-5, 1) @ rotation_matrix(30) @ offset_matrix(5, -1),
+        )
+
+    def test_ndc(self):
+        window = Window(Vec2(-2, 1), Vec2(6, 5), angle=30)
+        np.testing.assert_allclose(
+            ndc_matrix(window),
+            offset_matrix(-2, -3)
+            @ rotation_matrix(-30)
+            @ scale_matrix(2 / 8, 2 / 4),
+        )
+
+    def test_ndc_corners(self):
+        window = Window(Vec2(-2, 1), Vec2(6, 5))
+        corners = np.array([[-2, 1, 1], [6, 5, 1]]) @ ndc_matrix(window)
+        np.testing.assert_allclose(corners, [[-1, -1, 1], [1, 1, 1]])
+
+    def test_viewport(self):
+        matrix = viewport_matrix(Rect(Vec2(0, 0), Vec2(300, 200)))
+        corners = np.array([[-1, -1, 1], [1, 1, 1]]) @ matrix
+        # Screen y grows down.
+        np.testing.assert_allclose(corners, [[0, 200, 1], [300, 0, 1]])
+
+    def test_cached_read_only(self):
+        window = Window(Vec2(0, 0), Vec2(10, 10))
+        matrix = ndc_matrix(window)
+        self.assertIs(ndc_matrix(Window(Vec2(0, 0), Vec2(10, 10))), matrix)
+        self.assertFalse(matrix.flags.writeable)
+
+        window.translate(Vec2(1, 0))
+        self.assertIsNot(ndc_matrix(window), matrix)
+
+
+class MatrixStackTest(unittest.TestCase):
+    def test_stacks(self):
+        values = np.array([[1, 2], [-3, 0.5]])
+        for stack, single in (
+            (offset_matrices, offset_matrix),
+            (scale_matrices, scale_matrix),
+        ):
+            np.testing.assert_allclose(
+                stack(values), [single(*v) for v in values]
+            )
+        np.testing.assert_allclose(
+            rotation_matrices([0, 30, -90]),
+            [rotation_matrix(a) for a in (0, 30, -90)],
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+import numpy as np
+
+from linalg import Vec2
+from vertexstore import VertexStore
+
+
+class VertexStoreTest(unittest.TestCase):
+    def test_allocate_is_contiguous(self):
+        store = VertexStore()
+        self.assertEqual(store.allocate(3), 0)
+        self.assertEqual(store.allocate(5), 3)
+        self.assertEqual(store.used, 8)
+        self.assertEqual(store.freed, 0)
+
+    def test_release_reuses_trailing_rows(self):
+        store = VertexStore()
+        store.allocate(3)
+        offset = store.allocate(5)
+        store.release(offset, 5)
+        self.assertEqual((store.used, store.freed), (3, 0))
+        self.assertEqual(store.allocate(2), 3)
+
+    def test_release_leaves_holes(self):
+        store = VertexStore()
+        offset = store.allocate(3)
+        store.allocate(5)
+        store.release(offset, 3)
+        self.assertEqual((store.used, store.freed), (8, 3))
+        self.assertEqual(store.allocate(1), 8)
+
+    def test_grow_keeps_rows(self):
+        store = VertexStore(capacity=2)
+        store.allocate(2)
+        store.world[:2] = [[1, 2, 1], [3, 4, 1]]
+        store.ndc[:2] = [[.1, .2, 1], [.3, .4, 1]]
+        world, ndc = store.world, store.ndc
+
+        self.assertEqual(store.allocate(3), 2)
+        self.assertIsNot(store.world, world)
+        self.assertIsNot(store.ndc, ndc)
+        self.assertEqual(store.capacity, VertexStore.MIN_CAPACITY)
+        np.testing.assert_array_equal(store.world[:2], world)
+        np.testing.assert_array_equal(store.ndc[:2], ndc)
+
+    def test_grow_doubles(self):
+        store = VertexStore(capacity=32)
+        store.allocate(32)
+        store.allocate(1)
+        self.assertEqual(store.capacity, 64)
+        store.allocate(100)
+        self.assertEqual(store.capacity, 133)
+
+    def test_from_vertices(self):
+        store = VertexStore.from_vertices([Vec2(1, 2), Vec2(3, 4)])
+        self.assertEqual((store.dim, store.used, store.capacity), (3, 2, 2))
+        np.testing.assert_array_equal(store.world, [[1, 2, 1], [3, 4, 1]])
+        self.assertEqual(store.ndc.shape, (2, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,8 @@
-import numpy as np
+from functools import lru_cache
 from math import cos, sin, radians
 
+import numpy as np
+
 from linalg import Vec3
 
 
@@ -12,55 +14,167 @@ from linalg import Vec3
 def offset_matrix(dx: float, dy: float) -> np.ndarray:
     return np.array(
         [
-            1, 0, 0,
-            0, 1, 0,
-            dx, dy, 1,
+            [1, 0, 0],
+            [0, 1, 0],
+            [dx, dy, 1],
         ],
         dtype=float
-    ).reshape(3, 3)
+    )
 
 
 def scale_matrix(sx: float, sy: float) -> np.ndarray:
     return np.array(
         [
-            sx, 0, 0,
-            0, sy, 0,
-            0, 0, 1,
+            [sx, 0, 0],
+            [0, sy, 0],
+            [0, 0, 1],
         ],
         dtype=float
-    ).reshape(3, 3)
+    )
 
 
 def rotation_matrix(angle: float) -> np.ndarray:
     angle = radians(angle)
+    c, s = cos(angle), sin(angle)
+
+    return np.array(
+        [
+            [c, -s, 0],
+            [s, c, 0],
+            [0, 0, 1],
+        ],
+        dtype=float
+    )
+
+
+def scale_about_matrix(
+    sx: float,
+    sy: float,
+    cx: float,
+    cy: float,
+) -> np.ndarray:
+    '''Scaling by `(sx, sy)` around the point `(cx, cy)`, in closed form.'''
+    return np.array(
+        [
+            [sx, 0, 0],
+            [0, sy, 0],
+            [cx * (1 - sx), cy * (1 - sy), 1],
+        ],
+        dtype=float
+    )
+
+
+def rotation_about_matrix(angle: float, rx: float, ry: float) -> np.ndarray:
+    '''Rotation by `angle` degrees around the point `(rx, ry)`, in closed
+    form.'''
+    angle = radians(angle)
+    c, s = cos(angle), sin(angle)
 
     return np.array(
         [
-            cos(angle), -sin(angle), 0,
-            sin(angle), cos(angle), 0,
-            0, 0, 1,
+            [c, -s, 0],
+            [s, c, 0],
+            [rx - rx * c - ry * s, ry + rx * s - ry * c, 1],
+        ],
+        dtype=float
+    )
+
+
+@lru_cache(maxsize=64)
+def _ndc_matrix(
+    xmin: float,
+    ymin: float,
+    xmax: float,
+    ymax: float,
+    angle: float,
+) -> np.ndarray:
+    # offset(-center) @ rotation(-angle) @ scale(2 / size), multiplied out.
+    cx = (xmin + xmax) / 2
+    cy = (ymin + ymax) / 2
+    sx = 2 / (xmax - xmin)
+    sy = 2 / (ymax - ymin)
+    angle = radians(angle)
+    c, s = cos(angle), sin(angle)
+
+    matrix = np.array(
+        [
+            [c * sx, s * sy, 0],
+            [-s * sx, c * sy, 0],
+            [(cy * s - cx * c) * sx, -(cx * s + cy * c) * sy, 1],
         ],
         dtype=float
-    ).reshape(3, 3)
+    )
+    matrix.flags.writeable = False
+    return matrix
 
 
 def ndc_matrix(window: 'Window') -> np.ndarray:
     '''Matrix for transforming world coordinates into Normalized Device
-    Coordinates'''
-    return (
-        offset_matrix(-window.centroid.x, -window.centroid.y)
-        @ rotation_matrix(-window.angle)
-        @ scale_matrix(2 / window.width, 2 / window.height)
+    Coordinates.
+
+    Results are cached on the window's corners and angle, and returned
+    read-only.'''
+    (xmin, ymin, _), (xmax, ymax, _) = window.vertices.tolist()
+    return _ndc_matrix(xmin, ymin, xmax, ymax, window.angle)
+
+
+@lru_cache(maxsize=16)
+def _viewport_matrix(
+    xmin: float,
+    ymin: float,
+    xmax: float,
+    ymax: float,
+) -> np.ndarray:
+    # scale(size / 2, -size / 2) @ offset(center), multiplied out.
+    matrix = np.array(
+        [
+            [(xmax - xmin) / 2, 0, 0],
+            [0, -(ymax - ymin) / 2, 0],
+            [(xmin + xmax) / 2, (ymin + ymax) / 2, 1],
+        ],
+        dtype=float
     )
+    matrix.flags.writeable = False
+    return matrix
 
 
 def viewport_matrix(viewport: 'Rect') -> np.ndarray:
     '''Matrix for transforming Normalized Device Coordinates into viewport
-    coordinates'''
-    return (
-        scale_matrix(viewport.width / 2, -viewport.height / 2)
-        @ offset_matrix(viewport.centroid.x, viewport.centroid.y)
-    )
+    coordinates. Cached and read-only, like `ndc_matrix`.'''
+    (xmin, ymin, _), (xmax, ymax, _) = viewport.vertices.tolist()
+    return _viewport_matrix(xmin, ymin, xmax, ymax)
+
+
+def offset_matrices(offsets: np.ndarray) -> np.ndarray:
+    '''Stack of `offset_matrix` for an `(K, 2)` array of offsets.'''
+    offsets = np.asarray(offsets, dtype=float)
+    matrices = np.zeros((len(offsets), 3, 3))
+    matrices[:, [0, 1, 2], [0, 1, 2]] = 1
+    matrices[:, 2, :2] = offsets
+    return matrices
+
+
+def scale_matrices(factors: np.ndarray) -> np.ndarray:
+    '''Stack of `scale_matrix` for an `(K, 2)` array of factors.'''
+    factors = np.asarray(factors, dtype=float)
+    matrices = np.zeros((len(factors), 3, 3))
+    matrices[:, 0, 0] = factors[:, 0]
+    matrices[:, 1, 1] = factors[:, 1]
+    matrices[:, 2, 2] = 1
+    return matrices
+
+
+def rotation_matrices(angles: np.ndarray) -> np.ndarray:
+    '''Stack of `rotation_matrix` for a `(K,)` array of angles in degrees.'''
+    angles = np.radians(np.asarray(angles, dtype=float))
+    c, s = np.cos(angles), np.sin(angles)
+    matrices = np.zeros((len(angles), 3, 3))
+    matrices[:, 0, 0] = c
+    matrices[:, 0, 1] = -s
+    matrices[:, 1, 0] = s
+    matrices[:, 1, 1] = c
+    matrices[:, 2, 2] = 1
+    return matrices
 
 
 # ------------------------------------------------------------------------------
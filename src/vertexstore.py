@@ -0,0 +1,66 @@
+'''Contiguous vertex storage shared by graphic objects.'''
+import numpy as np
+
+from linalg import Point2, Point3, points_to_array
+
+
+class VertexStore:
+    '''World and NDC vertex buffers, sliced by offset and length.'''
+
+    MIN_CAPACITY = 16
+
+    def __init__(self, dim: int = 3, capacity: int = 0):
+        self.dim = dim
+        self.world = np.zeros((capacity, dim), dtype=float)
+        self.ndc = np.zeros((capacity, 3), dtype=float)
+        # Rows [0, used) have been handed out, `freed` of them are holes.
+        self.used = 0
+        self.freed = 0
+
+    @classmethod
+    def from_vertices(cls, vertices) -> 'VertexStore':
+        '''Creates a store holding exactly the given vertices.'''
+        if len(vertices) and isinstance(vertices[0], (Point2, Point3)):
+            world = points_to_array(vertices)
+        else:
+            world = np.array(vertices, dtype=float)
+        if world.ndim != 2:
+            world = world.reshape(-1, 3)
+
+        store = cls(dim=world.shape[1])
+        store.world = world
+        store.ndc = np.zeros((len(world), 3), dtype=float)
+        store.used = len(world)
+        return store
+
+    @property
+    def capacity(self) -> int:
+        return len(self.world)
+
+    def allocate(self, length: int) -> int:
+        '''Reserves `length` rows and returns their offset. Growing
+        reallocates the buffers, so older views go stale.'''
+        if self.used + length > self.capacity:
+            self._grow(self.used + length)
+
+        offset = self.used
+        self.used += length
+        return offset
+
+    def release(self, offset: int, length: int):
+        '''Returns rows to the store; only a trailing slice is reused.'''
+        if offset + length == self.used:
+            self.used -= length
+        else:
+            self.freed += length
+
+    def _grow(self, min_capacity: int):
+        capacity = max(min_capacity, 2 * self.capacity, self.MIN_CAPACITY)
+
+        world = np.zeros((capacity, self.dim), dtype=float)
+        world[:self.used] = self.world[:self.used]
+        ndc = np.zeros((capacity, 3), dtype=float)
+        ndc[:self.used] = self.ndc[:self.used]
+
+        self.world = world
+        self.ndc = ndc
@@ -1,7 +1,8 @@
+import threading
 from enum import auto, Enum
 
 import gi
-from gi.repository import Gtk, Gdk
+from gi.repository import Gtk, Gdk, GLib
 
 from clipping import LineClippingMethod
 from graphics import (
@@ -15,9 +16,10 @@ from graphics import (
     Window,
 )
 from graphics3d import GraphicObject3D, Vec3
-from cgcodecs import load_scene, save_scene
+from cgcodecs import BinaryCodec, read_scene_batches, save_scene
+from render import RetainedFrame, TileCache, draw_frame
 from scene import Scene
-from transformations import rotation_matrix, viewport_matrix
+from transformations import rotation_matrix
 
 gi.require_version('Gtk', '3.0')
 gi.require_foreign('cairo')
@@ -147,6 +149,60 @@ class NewObjectDialog(Gtk.Dialog):
         self.dialog_window = self.builder.get_object('new_object_window')
 
 
+class LoadCancelled(Exception):
+    pass
+
+
+class SceneLoader(threading.Thread):
+    '''Reads a scene file in a worker thread, calling back on the GTK main
+    loop until cancelled.'''
+
+    BATCH_SIZE = 2048
+
+    def __init__(self, path: str, on_batch, on_progress, on_done):
+        super().__init__(daemon=True)
+        self.path = path
+        self.on_batch = on_batch
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def run(self):
+        error = None
+        try:
+            for _, objs, store in read_scene_batches(
+                self.path,
+                self.BATCH_SIZE,
+                self._progress,
+            ):
+                if self.cancelled:
+                    return
+                GLib.idle_add(self._deliver, self.on_batch, objs, store)
+        except LoadCancelled:
+            return
+        except Exception as e:
+            error = e
+        GLib.idle_add(self._deliver, self.on_done, error)
+
+    def _progress(self, fraction: float):
+        # Also called while parsing vertices, so cancelling stops there.
+        if self.cancelled:
+            raise LoadCancelled()
+        GLib.idle_add(self._deliver, self.on_progress, fraction)
+
+    def _deliver(self, callback, *args) -> bool:
+        if not self.cancelled:
+            callback(*args)
+        return GLib.SOURCE_REMOVE
+
+
 class MainWindowHandler:
     def __init__(self, builder):
         self.builder = builder
@@ -158,6 +214,8 @@ class MainWindowHandler:
         self.old_size = None
         self.rotation_ref = RotationRef.CENTER
         self.current_file = None
+        self.loader = None
+        self.frame = RetainedFrame(tiles=TileCache())
         self.clipping_method = LineClippingMethod.COHEN_SUTHERLAND
         self.pressed_keys = set()
 
@@ -209,6 +267,7 @@ class MainWindowHandler:
         adjustment.set_value(adjustment.get_upper())
 
     def on_destroy(self, *args):
+        self.cancel_load()
         self.window.get_application().quit()
 
     def on_resize(self, widget: Gtk.Widget, allocation: Gdk.Rectangle):
@@ -233,7 +292,7 @@ class MainWindowHandler:
         )
         self.old_size = allocation
 
-        self.scene.update_ndc()
+        self.scene.window_changed()
 
     def viewport(self) -> Rect:
         widget = self.builder.get_object('drawing_area')
@@ -246,22 +305,10 @@ class MainWindowHandler:
         ).with_margin(10)
 
     def on_draw(self, widget, cr):
-        viewport = self.viewport()
-        vp_matrix = viewport_matrix(viewport)
-
-        cr.set_line_width(2.0)
-        cr.paint()
-        cr.set_source_rgb(0.8, 0.0, 0.0)
-
-        for obj in self.scene.objs:
-            clipped = obj.clipped(
-                method=self.clipping_method
-            )
-            if clipped:
-                clipped.draw(cr, vp_matrix)
-
-        cr.set_source_rgb(0.4, 0.4, 0.4)
-        viewport.draw(cr, vp_matrix)
+        # Re-renders only what the last frame does not already show.
+        draw_frame(
+            cr, self.scene, self.viewport(), self.clipping_method, self.frame
+        )
 
     def on_new_object(self, widget):
         dialog = NewObjectDialog()
@@ -401,7 +448,6 @@ class MainWindowHandler:
                     obj.rotate(args[0], 0, 0, ref)
                 else:
                     obj.rotate(*args, ref)
-            obj.update_ndc(self.scene.window)
 
         self.window.queue_draw()
 
@@ -446,6 +492,7 @@ class MainWindowHandler:
 
     def on_new_file(self, item):
         self.log('NEW FILE')
+        self.cancel_load()
         old_window = self.scene.window
         self.scene = Scene(window=old_window)
         self.object_store.clear()
@@ -459,19 +506,74 @@ class MainWindowHandler:
         if response == Gtk.ResponseType.OK:
             path = file_chooser.get_filename()
             self.log(f'OPEN FILE: {path}')
+            self.load_file(path)
+        file_chooser.destroy()
+
+    def load_file(self, path: str):
+        '''Replaces the scene with the objects in `path`, read in the
+        background, keeping the window.'''
+        self.cancel_load()
+        self.scene = Scene(window=self.scene.window)
+        self.object_store.clear()
+        # Only a completely loaded file can be saved over.
+        self.current_file = None
+        self.builder.get_object('drawing_area').queue_draw()
 
-            old_window = self.scene.window
-            self.scene = load_scene(path)
-            self.scene.window = old_window
-            self.scene.update_ndc()
+        self.loader = SceneLoader(
+            path,
+            self.on_load_batch,
+            self.on_load_progress,
+            self.on_load_done,
+        )
+        progress = self.builder.get_object('load-progress')
+        progress.set_fraction(0.0)
+        progress.set_text(f'Loading {path}')
+        self.builder.get_object('load-box').show()
+        self.loader.start()
+
+    def on_load_batch(self, objs, store):
+        if store is not None and store is not self.scene.store:
+            if not self.scene.objs:
+                # Adopting objects into another store would copy them out
+                # of the mapped file.
+                self.scene = Scene(window=self.scene.window, store=store)
+
+        tree = self.builder.get_object('tree-displayfiles')
+        # Rows appended to a detached model do not update the view one by
+        # one.
+        tree.set_model(None)
+        for obj in objs:
+            self.scene.add_object(obj)
+            self.add_to_treeview(obj)
+        tree.set_model(self.object_store)
+        self.builder.get_object('drawing_area').queue_draw()
+
+    def on_load_progress(self, fraction: float):
+        self.builder.get_object('load-progress').set_fraction(fraction)
 
-            self.object_store.clear()
-            for obj in self.scene.objs:
-                self.add_to_treeview(obj)
+    def on_load_done(self, error):
+        path = self.loader.path
+        self.loader = None
+        self.builder.get_object('load-box').hide()
 
+        if error is not None:
+            self.log(f'ERROR: could not load {path}: {error}')
+        else:
             self.current_file = path
-            self.builder.get_object('drawing_area').queue_draw()
-        file_chooser.destroy()
+            self.log(f'FILE LOADED: {len(self.scene.objs)} objects')
+
+    def on_cancel_load(self, widget):
+        if self.loader is not None:
+            self.log(f'LOADING CANCELLED: {self.loader.path}')
+        self.cancel_load()
+
+    def cancel_load(self):
+        '''Stops a background load, keeping the objects already added.'''
+        if self.loader is None:
+            return
+        self.loader.cancel()
+        self.loader = None
+        self.builder.get_object('load-box').hide()
 
     def on_save_file(self, item):
         label = item.get_label()
@@ -515,13 +617,17 @@ class MainWindowHandler:
         filter.add_pattern('*.obj')
         file_chooser.add_filter(filter)
 
+        filter = Gtk.FileFilter()
+        filter.set_name('CG binary scene')
+        filter.add_pattern(f'*{BinaryCodec.EXTENSION}')
+        file_chooser.add_filter(filter)
+
         return file_chooser
 
     def on_clicked_rotate_window(self, widget: Gtk.Button):
         rotation_angle = int(entry_text(self, 'window-rot-entry'))
         self.scene.window.angle += rotation_angle
-        for obj in self.scene.objs:
-            obj.update_ndc(self.scene.window)
+        self.scene.rotate_window()
         self.log(f'Window rotated {rotation_angle} degrees')
         self.window.queue_draw()
 